@@ -15,6 +15,9 @@ BACKUP_DATE = datetime.now().strftime("%s")
 
 logger = logging.getLogger("vpnc-migrate")
 
+# Use the libyaml based loader if PyYAML is built with it, it is a lot faster.
+YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
 
 def _backup():
     # Backup service configs
@@ -42,7 +45,7 @@ def _backup():
 def _get_version(path: pathlib.Path) -> Version | None:
     with open(path, encoding="utf-8") as fh:
         try:
-            service: dict = yaml.safe_load(fh)
+            service: dict = yaml.load(fh, Loader=YAML_LOADER)  # noqa: S506
         except yaml.YAMLError:
             logger.error("Invalid YAML found in %s. Skipping.", path, exc_info=True)
             return None
@@ -64,7 +67,7 @@ if VERSION is not None and Version("0.0.12") > VERSION:
         "r+",
         encoding="utf-8",
     ) as fc:
-        v12_svc: dict = yaml.safe_load(fa)
+        v12_svc: dict = yaml.load(fa, Loader=YAML_LOADER)  # noqa: S506
 
         v12_svc["version"] = "0.0.12"
         v12_svc["network"] = {
@@ -121,7 +124,7 @@ if VERSION is not None and Version("0.0.12") > VERSION:
             "r+",
             encoding="utf-8",
         ) as fc:
-            v12_rem: dict = yaml.safe_load(fa)
+            v12_rem: dict = yaml.load(fa, Loader=YAML_LOADER)  # noqa: S506
 
             v12_rem["version"] = "0.0.12"
             v12_rem["connections"] = v12_rem.pop("tunnels", {})
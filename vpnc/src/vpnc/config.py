@@ -4,6 +4,7 @@ from __future__ import annotations
 
 import ipaddress
 import logging
+import os
 import pwd
 import re
 from pathlib import Path
@@ -52,8 +53,33 @@ IPSEC_CONFIG_DIR = Path("/etc/swanctl/conf.d/")
 WIREGUARD_CONFIG_DIR = Path("/etc/wireguard/")
 # Configuration file paths/directories for FRR
 FRR_CONFIG_PATH = Path("/etc/frr/frr.conf")
+
+# Addresses of the veth links between the CORE and the DOWNLINK/ENDPOINT network
+# instances. These are used as the gateway for every route across the links.
+VETH_CORE_IPV4 = ipaddress.IPv4Address("169.254.0.1")
+VETH_CORE_IPV6 = ipaddress.IPv6Address("fe80::")
+VETH_DOWNLINK_IPV4 = ipaddress.IPv4Address("169.254.0.2")
+VETH_DOWNLINK_IPV6 = ipaddress.IPv6Address("fe80::1")
+
+# Maximum number of DOWNLINK tenants that are applied concurrently.
+TENANT_SETUP_WORKERS = 4
+# Maximum number of DOWNLINK network instances of a tenant that are set up or removed
+# concurrently.
+NI_SETUP_WORKERS = 8
+# Maximum number of connections of a network instance that are created concurrently.
+CONNECTION_SETUP_WORKERS = 4
+
+# How configuration directories are watched for changes: 'inotify', 'polling' or
+# 'auto'. 'auto' polls directories on file systems where inotify misses changes.
+WATCHER_MODE = os.environ.get("VPNC_WATCHER_MODE", "auto").lower()
+# File systems on which changes are polled in 'auto' mode.
+WATCHER_POLLING_FS_TYPES = ("9p", "cifs", "fuse", "nfs", "nfs4", "overlay", "smb3")
+# Seconds between polls of a directory.
+WATCHER_POLLING_INTERVAL = 5
 # Installation directory
 VPNC_INSTALL_DIR = Path("/opt/ncubed/vpnc/")
+# Compiled Jinja templates, so they aren't compiled again on every start.
+VPNC_TEMPLATES_CACHE_DIR = Path("/var/cache/ncubed/vpnc/templates/")
 # Active configuration items
 VPNC_A_CONFIG_DIR = Path("/opt/ncubed/config/vpnc/active/")
 VPNC_A_CONFIG_PATH_SERVICE = VPNC_A_CONFIG_DIR.joinpath(f"{DEFAULT_TENANT}.yaml")
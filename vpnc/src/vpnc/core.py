@@ -5,6 +5,7 @@ observers.
 """
 
 import logging
+import pathlib
 import subprocess
 import sys
 import time
@@ -16,7 +17,7 @@ from vpnc.services import configuration, frr, strongswan, vpncmangle, wireguard
 logger = logging.getLogger("vpnc")
 
 
-def concentrator() -> None:
+def concentrator() -> None:  # noqa: PLR0915
     """Set up the DEFAULT tenant."""
     default_tenant = tenant.get_default_tenant()
     logger.info("#" * 100)
@@ -28,17 +29,20 @@ def concentrator() -> None:
     # Mount the DEFAULT network instance with it's alias. This makes for consistent
     # operation between all network instances
     logger.info("Mounting default namespace as %s", config.DEFAULT_NI)
-    proc = subprocess.run(  # noqa: S602
-        f"""
-        mkdir -m=755 -p /var/run/netns/
-        touch /var/run/netns/{config.DEFAULT_NI}
-        mount --bind /proc/1/ns/net /var/run/netns/{config.DEFAULT_NI}
-        """,
-        stdout=subprocess.PIPE,
-        shell=True,
+    netns_dir = pathlib.Path("/var/run/netns")
+    netns_dir.mkdir(mode=0o755, parents=True, exist_ok=True)
+    netns_dir.joinpath(config.DEFAULT_NI).touch()
+    # mount and modprobe don't write anything to stdout when they succeed.
+    subprocess.run(  # noqa: S603
+        [
+            "/usr/bin/mount",
+            "--bind",
+            "/proc/1/ns/net",
+            str(netns_dir.joinpath(config.DEFAULT_NI)),
+        ],
+        stdout=subprocess.DEVNULL,
         check=True,
     )
-    logger.debug(proc.stdout)
 
     # Create and mount the EXTERNAL network instance.
     # This provides VPN connectivity
@@ -79,13 +83,15 @@ def concentrator() -> None:
         # before it can be used.
         # Load the NAT64 kernel module (jool). This may cause the program to exit if
         # it fails to start
-        logger.info("Loading kernel module Jool.")
-        proc = subprocess.run(  # noqa: S603
-            ["/usr/sbin/modprobe", "jool"],
-            stdout=subprocess.PIPE,
-            check=True,
-        )
-        logger.debug(proc.stdout)
+        if pathlib.Path("/sys/module/jool").exists():
+            logger.info("Kernel module Jool is already loaded.")
+        else:
+            logger.info("Loading kernel module Jool.")
+            subprocess.run(  # noqa: S603
+                ["/usr/sbin/modprobe", "jool"],
+                stdout=subprocess.DEVNULL,
+                check=True,
+            )
 
         # VPNC in hub mode doctors DNS responses so requests are sent via the tunnel.
         # Start the VPNC mangle process in the CORE network instance.
@@ -101,9 +107,9 @@ def concentrator() -> None:
     configuration_obs = configuration.observe_configuration()
     configuration_obs.start()
 
+    # Files the observer already picked up aren't applied twice.
     config_files = list(config.VPNC_A_CONFIG_DIR.glob(pattern="*.yaml"))
-    for file_path in config_files:
-        configuration.manage_tenant(file_path)
+    configuration.apply_tenant_configs(config_files)
 
     # Keep the program running, but terminate if needed.
     try:
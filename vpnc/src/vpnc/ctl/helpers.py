@@ -66,12 +66,14 @@ def get_service_config(
 ) -> vpnc.models.tenant.ServiceEndpoint | vpnc.models.tenant.ServiceHub:
     """Get the service configuration from a file."""
     service: vpnc.models.tenant.ServiceEndpoint | vpnc.models.tenant.ServiceHub
-    with path.open(encoding="utf-8") as f:
-        try:
-            service = vpnc.models.tenant.ServiceEndpoint(**yaml.safe_load(f))
-        except ValidationError:
-            f.seek(0)
-            service = vpnc.models.tenant.ServiceHub(**yaml.safe_load(f))
+    service_yaml = yaml.load(
+        path.read_bytes(),
+        Loader=vpnc.models.tenant.YAML_LOADER,  # noqa: S506
+    )
+    try:
+        service = vpnc.models.tenant.ServiceEndpoint(**service_yaml)
+    except ValidationError:
+        service = vpnc.models.tenant.ServiceHub(**service_yaml)
 
     return service
 
@@ -106,11 +108,15 @@ def get_tenant_config(
         | vpnc.models.tenant.ServiceHub
         | vpnc.models.tenant.Tenant
     )
-    with config_path.open(encoding="utf-8") as fh:
-        if tenant_id == config.DEFAULT_TENANT:
-            tenant = get_service_config(ctx, config_path)
-        else:
-            tenant = vpnc.models.tenant.Tenant(**yaml.safe_load(fh))
+    if tenant_id == config.DEFAULT_TENANT:
+        tenant = get_service_config(ctx, config_path)
+    else:
+        tenant = vpnc.models.tenant.Tenant(
+            **yaml.load(
+                config_path.read_bytes(),
+                Loader=vpnc.models.tenant.YAML_LOADER,  # noqa: S506
+            ),
+        )
     if tenant_id != tenant.id:
         ctx.fail(f"Mismatch between file name '{tenant_id}' and id '{tenant.id}'.")
 
@@ -99,10 +99,24 @@ def show(
 
     output = tenant.model_dump(mode="json")
     if full:
-        print(yaml.safe_dump(output, explicit_start=True, explicit_end=True))
+        print(
+            yaml.dump(
+                output,
+                Dumper=vpnc.models.tenant.YAML_DUMPER,
+                explicit_start=True,
+                explicit_end=True,
+            ),
+        )
     else:
         output["network_instance_count"] = len(output.pop("network_instances"))
-        print(yaml.safe_dump(output, explicit_start=True, explicit_end=True))
+        print(
+            yaml.dump(
+                output,
+                Dumper=vpnc.models.tenant.YAML_DUMPER,
+                explicit_start=True,
+                explicit_end=True,
+            ),
+        )
 
 
 @app.command()
@@ -140,8 +154,9 @@ def edit(ctx: typer.Context) -> None:
 
     with tempfile.NamedTemporaryFile(suffix=".tmp", mode="w+", encoding="utf-8") as tf:
         tf.write(
-            yaml.safe_dump(
+            yaml.dump(
                 tenant.model_dump(mode="json"),
+                Dumper=vpnc.models.tenant.YAML_DUMPER,
                 explicit_start=True,
                 explicit_end=True,
             ),
@@ -155,11 +170,17 @@ def edit(ctx: typer.Context) -> None:
                 edited_config_str = tf.read()
                 if tenant_id == config.DEFAULT_TENANT:
                     edited_config = vpnc.models.tenant.Service(
-                        config=yaml.safe_load(edited_config_str),
+                        config=yaml.load(
+                            edited_config_str,
+                            Loader=vpnc.models.tenant.YAML_LOADER,  # noqa: S506
+                        ),
                     ).config
                 else:
                     edited_config = vpnc.models.tenant.Tenant(
-                        **yaml.safe_load(edited_config_str),
+                        **yaml.load(
+                            edited_config_str,
+                            Loader=vpnc.models.tenant.YAML_LOADER,  # noqa: S506
+                        ),
                     )
                 if tenant_id != edited_config.id:
                     msg = f"Mismatch between file name '{tenant_id}' and id '{edited_config.id}'"
@@ -183,8 +204,9 @@ def edit(ctx: typer.Context) -> None:
 
     print("Edited file")
 
-    output = yaml.safe_dump(
+    output = yaml.dump(
         edited_config.model_dump(mode="json"),
+        Dumper=vpnc.models.tenant.YAML_DUMPER,
         explicit_start=True,
         explicit_end=True,
     )
@@ -224,8 +246,9 @@ def add(
     all_args.update({"id": tenant_id})
     tenant = vpnc.models.tenant.Tenant(**all_args)
 
-    output = yaml.safe_dump(
+    output = yaml.dump(
         tenant.model_dump(mode="json"),
+        Dumper=vpnc.models.tenant.YAML_DUMPER,
         explicit_start=True,
         explicit_end=True,
     )
@@ -338,13 +361,16 @@ def delete(
         print(f"Tenant '{tenant_id}' doesn't exist.")
         return
     with path.open(encoding="utf-8") as f:
-        tenant = vpnc.models.tenant.Tenant(**yaml.safe_load(f))
+        tenant = vpnc.models.tenant.Tenant(
+            **yaml.load(f, Loader=vpnc.models.tenant.YAML_LOADER),  # noqa: S506
+        )
     if tenant_id != tenant.id:
         print(f"Mismatch between file name '{tenant_id}' and id '{tenant.id}'.")
         return
 
-    output = yaml.safe_dump(
+    output = yaml.dump(
         tenant.model_dump(mode="json"),
+        Dumper=vpnc.models.tenant.YAML_DUMPER,
         explicit_start=True,
         explicit_end=True,
     )
@@ -27,36 +27,26 @@ def check_system_requirements() -> None:
         "veth",
         "wireguard",
     ]
-    module: str = ""
-    try:
-        for module in module_list:
-            logger.debug("Verifying kernel module %s is installed", module)
-            subprocess.run(  # noqa: S603
-                ["/usr/sbin/modinfo", module],
-                check=True,
-                stdout=subprocess.PIPE,
-            )
-    except subprocess.CalledProcessError:
-        logger.critical("The '%s' kernel module isn't installed. Exiting.", module)
-        sys.exit(1)
 
     tenant_config, _ = tenant.load_tenant_config(config.VPNC_A_CONFIG_PATH_SERVICE)
     if not isinstance(tenant_config, (tenant.ServiceHub, tenant.ServiceEndpoint)):
         logger.critical("Service configuration is invalid")
         sys.exit(1)
 
-    if tenant_config.mode != enums.ServiceMode.HUB:
-        return
-
-    hub_module_list: list[str] = ["xt_NETMAP", "xt_NFQUEUE"]
-    try:
-        for module in hub_module_list:
-            logger.debug("Verifying kernel module %s is installed", module)
-            subprocess.run(  # noqa: S603
-                ["/usr/sbin/modinfo", module],
-                stdout=subprocess.PIPE,
-                check=True,
-            )
-    except subprocess.CalledProcessError:
-        logger.critical("The '%s' kernel module isn't installed. Exiting.", module)
-        sys.exit(1)
+    if tenant_config.mode == enums.ServiceMode.HUB:
+        module_list.extend(["xt_NETMAP", "xt_NFQUEUE"])
+
+    logger.debug("Verifying kernel modules %s are installed", ", ".join(module_list))
+    # A single modinfo process reports the name of every module it finds.
+    proc = subprocess.run(  # noqa: S603
+        ["/usr/sbin/modinfo", "--field", "name", *module_list],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        text=True,
+        check=False,
+    )
+    found = {name.replace("-", "_") for name in proc.stdout.split()}
+    for module in module_list:
+        if module.replace("-", "_") not in found:
+            logger.critical("The '%s' kernel module isn't installed. Exiting.", module)
+            sys.exit(1)
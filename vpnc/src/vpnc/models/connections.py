@@ -158,12 +158,16 @@ class Connection(BaseModel):
                 )
                 raise ValueError
 
-            ipv4_ni_network: IPv4Network = list(pdi4.subnets(new_prefix=24))[
-                network_instance_id
-            ]
-            ipv4_con_network = list(ipv4_ni_network.subnets(new_prefix=28))[self.id]
+            # Each network instance gets a /24 and each connection a /28 of that.
+            # The interface uses the first host address of the /28.
+            ipv4_con_address = (
+                int(pdi4.network_address)
+                + (network_instance_id << 8)
+                + (self.id << 4)
+                + 1
+            )
             interface_ipv4_address = [
-                ipaddress.IPv4Interface(f"{ipv4_con_network[1]}/28"),
+                ipaddress.IPv4Interface((ipv4_con_address, 28)),
             ]
         else:
             interface_ipv4_address = self.interface.ipv4  # pylint: disable=no-member
@@ -182,12 +186,15 @@ class Connection(BaseModel):
                 )
                 raise ValueError
             pdi6 = default_tenant.prefix_downlink_interface_v6
-            ipv6_ni_network_list = list(pdi6.subnets(new_prefix=48))
-            ipv6_ni_network: IPv6Network = ipv6_ni_network_list[network_instance_id]
+            # Each network instance gets a /48 and each connection a /64 of that.
+            # Calculate the offset instead of listing all subnets of the prefix.
+            ipv6_con_network_address = (
+                int(pdi6.network_address)
+                + (network_instance_id << 80)
+                + (self.id << 64)
+            )
             interface_ipv6_address = [
-                ipaddress.IPv6Interface(
-                    list(ipv6_ni_network.subnets(new_prefix=64))[self.id],
-                ),
+                ipaddress.IPv6Interface((ipv6_con_network_address, 64)),
             ]
         else:
             interface_ipv6_address = self.interface.ipv6  # pylint: disable=no-member
@@ -2,7 +2,9 @@
 
 from __future__ import annotations
 
-from pydantic import BaseModel
+import functools
+
+from pydantic import BaseModel, ConfigDict
 
 from vpnc import config
 
@@ -10,6 +12,8 @@ from vpnc import config
 class TenantInformation(BaseModel):
     """Contains the parsed tenant/network/connection information."""
 
+    model_config = ConfigDict(frozen=True)
+
     tenant: str
     tenant_ext: int
     tenant_ext_str: str
@@ -21,10 +25,14 @@ class TenantInformation(BaseModel):
     connection_id: int | None
 
 
+@functools.lru_cache(maxsize=4096)
 def parse_downlink_network_instance_name(
     name: str,
 ) -> TenantInformation:
-    """Parse a connection name into it's components."""
+    """Parse a connection name into it's components.
+
+    The result is cached per name, which is why the returned model is frozen.
+    """
     if config.DOWNLINK_CON_RE.match(name):
         return TenantInformation(
             tenant=name[:5],
@@ -2,9 +2,7 @@
 
 from __future__ import annotations
 
-import json
 import logging
-import subprocess
 from enum import Enum
 from ipaddress import IPv4Address, IPv4Network, IPv6Address, IPv6Network
 from typing import TYPE_CHECKING, Any, Literal
@@ -16,6 +14,7 @@ from pydantic import BaseModel, Field, field_validator
 
 from vpnc import config
 from vpnc.models import connections, enums
+from vpnc.network import interface
 
 if TYPE_CHECKING:
     import vpnc.models.network_instance
@@ -91,51 +90,47 @@ class ConnectionConfigIPsec(BaseModel):
     ) -> str:
         """Create an XFRM interface."""
         xfrm = self.intf_name(network_instance, connection)
-        vpn_id = int(f"0x1000000{connection.id}", 16)
+        # The XFRM interface ID is the network instance ID in hexadecimal followed by
+        # the connection ID as the last hexadecimal digit.
+        vpn_id = 0x10000000 + connection.id
         if network_instance.type == enums.NetworkInstanceType.DOWNLINK:
-            vpn_id = int(
-                f"0x{network_instance.id.replace('-', '')}{connection.id}",
-                16,
-            )
+            vpn_id = (
+                int(network_instance.id.replace("-", ""), 16) << 4
+            ) + connection.id
 
         if_ipv4, if_ipv6 = connection.calc_interface_ip_addresses(
             network_instance,
         )
 
-        with pyroute2.NetNS(netns=network_instance.id) as ni_dl, pyroute2.NetNS(
-            netns=config.EXTERNAL_NI,
-        ) as ni_ext:
-            if not ni_dl.link_lookup(ifname=xfrm):
-                ni_ext.link(
-                    "add",
-                    ifname=xfrm,
-                    kind="xfrm",
-                    xfrm_if_id=vpn_id,
-                )
-                ifid_ext_xfrm = ni_ext.link_lookup(ifname=xfrm)[0]
-                ni_ext.link(
-                    "set",
-                    index=ifid_ext_xfrm,
-                    net_ns_fd=network_instance.id,
-                )
-
-            ifidx_xfrm = ni_dl.link_lookup(ifname=xfrm)[0]
+        with pyroute2.NetNS(netns=network_instance.id) as ni_dl:
+            if not (ifidx := ni_dl.link_lookup(ifname=xfrm)):
+                # Interfaces are created in the EXTERNAL network instance. Only open
+                # a socket there when the interface doesn't exist yet.
+                with pyroute2.NetNS(netns=config.EXTERNAL_NI) as ni_ext:
+                    ni_ext.link(
+                        "add",
+                        ifname=xfrm,
+                        kind="xfrm",
+                        xfrm_if_id=vpn_id,
+                    )
+                    ifid_ext_xfrm = ni_ext.link_lookup(ifname=xfrm)[0]
+                    ni_ext.link(
+                        "set",
+                        index=ifid_ext_xfrm,
+                        net_ns_fd=network_instance.id,
+                    )
+                ifidx = ni_dl.link_lookup(ifname=xfrm)
+
+            ifidx_xfrm = ifidx[0]
             ni_dl.flush_addr(index=ifidx_xfrm, scope=enums.IPRouteScope.GLOBAL.value)
 
-            for ipv4 in if_ipv4:
-                ni_dl.addr(
-                    "replace",
-                    index=ifidx_xfrm,
-                    address=str(ipv4.ip),
-                    prefixlen=ipv4.network.prefixlen,
-                )
-            # Add the configured IPv6 address to the XFRM interface.
-            for ipv6 in if_ipv6:
+            # Add the configured IPv4 and IPv6 addresses to the XFRM interface.
+            for if_ip in (*if_ipv4, *if_ipv6):
                 ni_dl.addr(
                     "replace",
                     index=ifidx_xfrm,
-                    address=str(ipv6.ip),
-                    prefixlen=ipv6.network.prefixlen,
+                    address=str(if_ip.ip),
+                    prefixlen=if_ip.network.prefixlen,
                 )
 
         return xfrm
@@ -149,10 +144,9 @@ class ConnectionConfigIPsec(BaseModel):
         interface_name = self.intf_name(network_instance, connection)
         # run the commands
         with pyroute2.NetNS(netns=network_instance.id) as ni_dl:
-            if not ni_dl.link_lookup(ifname=interface_name):
+            if not (ifidx := ni_dl.link_lookup(ifname=interface_name)):
                 return
-            ifidx = ni_dl.link_lookup(ifname=interface_name)[0]
-            ni_dl.link("del", index=ifidx)
+            ni_dl.link("del", index=ifidx[0])
 
         vcs = vici.Session()
         try:
@@ -186,22 +180,7 @@ class ConnectionConfigIPsec(BaseModel):
         )
 
         if_name = self.intf_name(network_instance, connection)
-        output = json.loads(
-            subprocess.run(  # noqa: S603
-                [
-                    "/usr/sbin/ip",
-                    "--json",
-                    "--netns",
-                    network_instance.id,
-                    "address",
-                    "show",
-                    "dev",
-                    if_name,
-                ],
-                stdout=subprocess.PIPE,
-                check=True,
-            ).stdout,
-        )[0]
+        output = interface.get(network_instance.id, if_name)
 
         status: str = sa[f"{network_instance.id}-{connection.id}"]["state"].decode()
         remote_addr: str = sa[f"{network_instance.id}-{connection.id}"][
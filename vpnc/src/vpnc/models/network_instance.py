@@ -2,6 +2,8 @@
 
 from __future__ import annotations
 
+import concurrent.futures
+import ipaddress
 import logging
 import pathlib
 import subprocess
@@ -9,12 +11,10 @@ import sys
 import threading
 import time
 from abc import abstractmethod
-from ipaddress import IPv4Address, IPv6Address
-from typing import Any, Literal
+from typing import TYPE_CHECKING, Any, Literal
 
 import pyroute2
 import pyroute2.netns
-from jinja2 import Environment, FileSystemLoader
 from pydantic import (
     BaseModel,
     ConfigDict,
@@ -25,16 +25,23 @@ from pydantic_core import PydanticCustomError
 
 import vpnc.shared
 from vpnc import config
-from vpnc.models import connections, enums, ssh, tenant
+from vpnc.models import connections, enums, tenant
 from vpnc.network import namespace, route
 from vpnc.services import configuration, frr, routes, strongswan
 
+if TYPE_CHECKING:
+    from jinja2 import Template
+
 # Needed for pydantim ports and type checking
 logger = logging.getLogger("vpnc")
 
 BASE_DIR = pathlib.Path(__file__).parent
 TEMPLATES_DIR = BASE_DIR.joinpath("templates")
-TEMPLATES_ENV = Environment(loader=FileSystemLoader(TEMPLATES_DIR), autoescape=True)
+TEMPLATES_ENV = vpnc.shared.get_templates_env(TEMPLATES_DIR)
+IPTABLES_CORE_TEMPLATE = TEMPLATES_ENV.get_template("iptables-core.conf.j2")
+IPTABLES_DOWNLINK_TEMPLATE = TEMPLATES_ENV.get_template("iptables-downlink.conf.j2")
+IPTABLES_ENDPOINT_TEMPLATE = TEMPLATES_ENV.get_template("iptables-endpoint.conf.j2")
+IPTABLES_EXTERNAL_TEMPLATE = TEMPLATES_ENV.get_template("iptables-external.conf.j2")
 
 
 class NetworkInstance(BaseModel):
@@ -90,6 +97,40 @@ class NetworkInstance(BaseModel):
         """Add ip(6)table rules for the namespace."""
         raise NotImplementedError
 
+    def _apply_iptables(
+        self,
+        template: Template,
+        iptables_configs: dict[str, Any],
+    ) -> None:
+        """Replace the ip(6)table rules of the network instance.
+
+        The rules are rendered per address family and loaded with (ip6)tables-restore,
+        which replaces every table in the rules at once.
+        """
+        logger.info(
+            "Configuring network instance %s iptables rules.",
+            self.id,
+        )
+        for family, command in (
+            ("ipv4", "/usr/sbin/iptables-restore"),
+            ("ipv6", "/usr/sbin/ip6tables-restore"),
+        ):
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(template.render(family=family, **iptables_configs))
+            # Stream the rules into the restore command as they are rendered.
+            with subprocess.Popen(  # noqa: S603
+                ["/usr/sbin/ip", "netns", "exec", self.id, command],
+                stdin=subprocess.PIPE,
+                text=True,
+            ) as proc:
+                assert proc.stdin is not None  # noqa: S101
+                template.stream(family=family, **iptables_configs).dump(proc.stdin)
+                # The last COMMIT must end with a newline, which the template strips.
+                proc.stdin.write("\n")
+                proc.stdin.close()
+            if proc.returncode != 0:
+                raise subprocess.CalledProcessError(proc.returncode, proc.args)
+
     def set_network_instance(
         self,
         active_network_instance: NetworkInstance | None,
@@ -115,7 +156,7 @@ class NetworkInstance(BaseModel):
 
             attempts = 20
             for attempt in range(attempts):
-                if self.id in pyroute2.netns.listnetns():
+                if namespace.exists(self.id):
                     break
                 if attempt == attempts - 1:
                     logger.error(
@@ -134,30 +175,16 @@ class NetworkInstance(BaseModel):
                 enums.NetworkInstanceType.ENDPOINT,
             ):
                 logger.info(
-                    "Enabling network instance %s IPv6 forwarding.",
-                    self.id,
-                )
-                proc = pyroute2.NSPopen(
-                    self.id,
-                    ["sysctl", "-w", "net.ipv6.conf.all.forwarding=1"],
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.PIPE,
-                )
-                proc.wait()
-                proc.release()
-
-                logger.info(
-                    "Enabling network instance %s IPv4 forwarding.",
+                    "Enabling network instance %s IPv6 and IPv4 forwarding.",
                     self.id,
                 )
-                proc = pyroute2.NSPopen(
+                namespace.set_sysctl(
                     self.id,
-                    ["sysctl", "-w", "net.ipv4.conf.all.forwarding=1"],
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.PIPE,
+                    {
+                        "net.ipv6.conf.all.forwarding": "1",
+                        "net.ipv4.conf.all.forwarding": "1",
+                    },
                 )
-                proc.wait()
-                proc.release()
 
             if self.type in (
                 enums.NetworkInstanceType.DOWNLINK,
@@ -186,16 +213,13 @@ class NetworkInstance(BaseModel):
                 self._delete_network_instance_link()
 
             # Break connections.
-            ssh_connections = [
-                x
-                for x in self.connections.values()
-                if x.config.type == enums.ConnectionType.SSH
-            ]
-            other_connections = [
-                x
-                for x in self.connections.values()
-                if x.config.type != ssh.ConnectionConfigSSH
-            ]
+            ssh_connections: list[connections.Connection] = []
+            other_connections: list[connections.Connection] = []
+            for x in self.connections.values():
+                if x.config.type == enums.ConnectionType.SSH:
+                    ssh_connections.append(x)
+                else:
+                    other_connections.append(x)
             sorted_connections = ssh_connections + other_connections
             for conn in sorted_connections:
                 logger.info(
@@ -210,13 +234,9 @@ class NetworkInstance(BaseModel):
         with vpnc.shared.NI_START_LOCK:
             del vpnc.shared.NI_LOCK[self.id]
 
-    def _get_network_instance_connections(self) -> list[str]:
+    def _get_network_instance_connections(self) -> set[str]:
         """Get all configured connections (interfaces)."""
-        configured_interfaces: set[str] = {
-            connection.intf_name(self) for connection in self.connections.values()
-        }
-
-        return list(configured_interfaces)
+        return {connection.intf_name(self) for connection in self.connections.values()}
 
     def _set_network_instance_connections(
         self,
@@ -231,15 +251,18 @@ class NetworkInstance(BaseModel):
             self._delete_network_instance_connections(
                 active_network_instance,
             )
+        connection_interfaces = self._add_network_instance_connections()
         ni_dl = pyroute2.NetNS(self.id)
         ni_core = pyroute2.NetNS(config.CORE_NI)
         with ni_dl, ni_core:
+            # Dump the links once instead of looking up the state of every connection.
+            link_states: dict[str, str] = {
+                link.get_attr("IFLA_IFNAME"): link.get("state", "down")
+                for link in ni_dl.get_links()
+            }
             for connection in self.connections.values():
-                logger.info(
-                    "Setting up network instance %s connection %s.",
-                    self.id,
-                    connection.id,
-                )
+                if (interface := connection_interfaces.get(connection.id)) is None:
+                    continue
                 active_connection = None
                 # Match the configured connection to an active, running connection,
                 # if it exists).
@@ -247,19 +270,9 @@ class NetworkInstance(BaseModel):
                     active_connection = active_network_instance.connections.get(
                         connection.id,
                     )
-                # Add connection
                 try:
-                    interface = connection.add(
-                        network_instance=self,
-                    )
                     interfaces.append(interface)
-                    intf = []
-                    if if_idx := ni_dl.link_lookup(ifname=interface):
-                        intf = ni_dl.get_links(if_idx[0])
-                    connection_state: str = "down"
-                    if intf:
-                        connection_state = intf[0].get("state")
-                    if connection_state == "up":
+                    if link_states.get(interface) == "up":
                         routes.set_routes_up(
                             ni_dl,
                             ni_core,
@@ -283,6 +296,59 @@ class NetworkInstance(BaseModel):
                     continue
                 time.sleep(0.01)
 
+    def _add_network_instance_connections(self) -> dict[int, str]:
+        """Create the connection interfaces and return their names by connection.
+
+        The connections don't depend on each other and are created concurrently,
+        except for SSH connections which are created once the others exist.
+        """
+
+        def add_connection(connection: connections.Connection) -> str | None:
+            logger.info(
+                "Setting up network instance %s connection %s.",
+                self.id,
+                connection.id,
+            )
+            try:
+                return connection.add(network_instance=self)
+            except Exception:
+                logger.exception(
+                    "Failed to set up connection '%s' interface(s)",
+                    connection,
+                )
+                return None
+
+        ssh_connections: list[connections.Connection] = []
+        other_connections: list[connections.Connection] = []
+        for x in self.connections.values():
+            if x.config.type == enums.ConnectionType.SSH:
+                ssh_connections.append(x)
+            else:
+                other_connections.append(x)
+
+        connection_interfaces: dict[int, str | None] = {}
+        if other_connections:
+            workers = min(config.CONNECTION_SETUP_WORKERS, len(other_connections))
+            with concurrent.futures.ThreadPoolExecutor(
+                max_workers=workers,
+                thread_name_prefix=f"vpnc-{self.id}",
+            ) as executor:
+                connection_interfaces = dict(
+                    zip(
+                        (x.id for x in other_connections),
+                        executor.map(add_connection, other_connections),
+                        strict=True,
+                    ),
+                )
+        for x in ssh_connections:
+            connection_interfaces[x.id] = add_connection(x)
+
+        return {
+            conn_id: interface
+            for conn_id, interface in connection_interfaces.items()
+            if interface is not None
+        }
+
     def _delete_network_instance_connections(
         self,
         active_network_instance: NetworkInstance | None,
@@ -302,12 +368,13 @@ class NetworkInstance(BaseModel):
 
         # It is important to break SSH connections first as these always depend on
         # another connection.
-        ssh_connections = [
-            x for x in active_connections if x.config.type == enums.ConnectionType.SSH
-        ]
-        other_connections = [
-            x for x in active_connections if x.config.type != enums.ConnectionType.SSH
-        ]
+        ssh_connections: list[connections.Connection] = []
+        other_connections: list[connections.Connection] = []
+        for x in active_connections:
+            if x.config.type == enums.ConnectionType.SSH:
+                ssh_connections.append(x)
+            else:
+                other_connections.append(x)
 
         sorted_connections = ssh_connections + other_connections
 
@@ -344,20 +411,21 @@ class NetworkInstance(BaseModel):
             tenant.get_default_tenant()
             # add veth interfaces between CORE and DOWNLINK network instance
             logger.info("Adding veth pair %s and %s.", veth_c, veth_d)
-            if not ni_core.link_lookup(ifname=veth_c):
+            if not (ifidx_veth_c := ni_core.link_lookup(ifname=veth_c)):
                 ni_core.link(
                     "add",
                     ifname=veth_c,
                     kind="veth",
                     peer={"ifname": veth_d, "net_ns_fd": self.id},
                 )
+                ifidx_veth_c = ni_core.link_lookup(ifname=veth_c)
             # bring veth interfaces up
             logger.info(
                 "Setting veth pair %s and %s interface status to up.",
                 veth_c,
                 veth_d,
             )
-            ifidx_core: int = ni_core.link_lookup(ifname=veth_c)[0]
+            ifidx_core: int = ifidx_veth_c[0]
             ifidx_dl: int = ni_dl.link_lookup(ifname=veth_d)[0]
 
             ni_core.link("set", index=ifidx_core, state="up")
@@ -406,7 +474,7 @@ class NetworkInstance(BaseModel):
                         ni_dl,
                         "replace",
                         dst=route6.to,
-                        gateway=IPv6Address("fe80::"),
+                        gateway=config.VETH_CORE_IPV6,
                         ifname=veth_d,
                     )
                 if default_tenant.mode != enums.ServiceMode.HUB:
@@ -421,7 +489,7 @@ class NetworkInstance(BaseModel):
                             ni_dl,
                             "replace",
                             dst=route4.to,
-                            gateway=IPv4Address("169.254.0.1"),
+                            gateway=config.VETH_CORE_IPV4,
                             ifname=veth_d,
                         )
 
@@ -429,22 +497,49 @@ class NetworkInstance(BaseModel):
         self,
     ) -> None:
         """Delete a link between a DOWNLINK and the CORE network instance."""
-        # run the netns remove commands
-        proc = subprocess.run(  # noqa: S602
-            f"""
-            # remove veth interfaces
-            /usr/sbin/ip --brief -netns {self.id} link show type veth |
-                awk -F '@' '{{print $1}}' |
-                xargs -I {{}} sudo /usr/sbin/ip -netns {self.id} link del {{}}
-            # remove NAT64
-            /usr/sbin/ip netns exec {self.id} jool instance remove {self.id}
-            """,
-            capture_output=True,
-            shell=True,
+        # Opening a namespace that doesn't exist creates it.
+        if not namespace.exists(self.id):
+            return
+
+        # remove veth interfaces. Deleting one end of a veth pair removes the peer in
+        # the CORE network instance as well.
+        with pyroute2.NetNS(netns=self.id) as ni_dl:
+            for link in tuple(ni_dl.get_links()):
+                link_info = link.get_attr("IFLA_LINKINFO")
+                if not link_info or link_info.get_attr("IFLA_INFO_KIND") != "veth":
+                    continue
+                logger.info(
+                    "Deleting network instance %s interface %s.",
+                    self.id,
+                    link.get_attr("IFLA_IFNAME"),
+                )
+                try:
+                    ni_dl.link("del", index=link["index"])
+                except pyroute2.NetlinkError:
+                    # The interface was removed along with its peer.
+                    continue
+
+        # remove NAT64
+        proc = subprocess.run(  # noqa: S603
+            [
+                "/usr/sbin/ip",
+                "netns",
+                "exec",
+                self.id,
+                "jool",
+                "instance",
+                "remove",
+                self.id,
+            ],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
             check=False,
         )
-        logger.info(proc.args)
-        logger.debug(proc.stdout, proc.stderr)
+        logger.info(
+            "Executing in network instance %s: %s",
+            self.id,
+            proc.args,
+        )
 
 
 class NetworkInstanceExternal(NetworkInstance):
@@ -481,23 +576,10 @@ class NetworkInstanceExternal(NetworkInstance):
 
         The EXTERNAL network instance blocks all traffic except for IKE, ESP and IPsec.
         """
-        iptables_template = TEMPLATES_ENV.get_template("iptables-external.conf.j2")
         iptables_configs = {
             "network_instance_name": self.id,
         }
-        iptables_render = iptables_template.render(**iptables_configs)
-        logger.info(
-            "Configuring network instance %s iptables rules.",
-            self.id,
-        )
-        logger.debug(iptables_render)
-        proc = subprocess.run(  # noqa: S602
-            iptables_render,
-            stdout=subprocess.PIPE,
-            shell=True,
-            check=True,
-        )
-        logger.debug(proc.stdout)
+        self._apply_iptables(IPTABLES_EXTERNAL_TEMPLATE, iptables_configs)
 
         return False
 
@@ -549,25 +631,12 @@ class NetworkInstanceCore(NetworkInstance):
 
         interfaces = self._get_network_instance_connections()
 
-        iptables_template = TEMPLATES_ENV.get_template("iptables-core.conf.j2")
         iptables_configs: dict[str, Any] = {
             "mode": default_tenant.mode,
             "network_instance_name": self.id,
             "interfaces": sorted(interfaces),
         }
-        iptables_render = iptables_template.render(**iptables_configs)
-        logger.info(
-            "Configuring network instance %s iptables rules.",
-            self.id,
-        )
-        logger.debug(iptables_render)
-        proc = subprocess.run(  # noqa: S602
-            iptables_render,
-            stdout=subprocess.PIPE,
-            shell=True,
-            check=True,
-        )
-        logger.debug(proc.stdout)
+        self._apply_iptables(IPTABLES_CORE_TEMPLATE, iptables_configs)
 
         return False
 
@@ -619,7 +688,6 @@ class NetworkInstanceDownlink(NetworkInstance):
         core_interfaces = [f"{self.id}_D"]
         downlink_interfaces = self._get_network_instance_connections()
 
-        iptables_template = TEMPLATES_ENV.get_template("iptables-downlink.conf.j2")
         updated, nptv6_networks = self._calculate_nptv6_mappings()
         iptables_configs = {
             "mode": mode,
@@ -628,19 +696,7 @@ class NetworkInstanceDownlink(NetworkInstance):
             "downlink_interfaces": sorted(downlink_interfaces),
             "nptv6_networks": nptv6_networks,
         }
-        iptables_render = iptables_template.render(**iptables_configs)
-        logger.info(
-            "Configuring network instance %s iptables rules.",
-            self.id,
-        )
-        logger.debug(iptables_render)
-        proc = subprocess.run(  # noqa: S602
-            iptables_render,
-            stdout=subprocess.PIPE,
-            shell=True,
-            check=True,
-        )
-        logger.debug(proc.stdout)
+        self._apply_iptables(IPTABLES_DOWNLINK_TEMPLATE, iptables_configs)
 
         return updated
 
@@ -706,34 +762,39 @@ class NetworkInstanceDownlink(NetworkInstance):
                 )
                 continue
 
-            # Calculate the NPTv6 translations if not already calculated.
-            for candidate_nptv6_prefix in nptv6_scope.subnets(new_prefix=nptv6_prefix):
-                # if the highest IP of the subnet is lower than the most recently
-                # added network
-                free = True
-                for npt in nptv6_list:
-                    if not npt.nptv6_prefix:
-                        continue
-                    # Check to be sure that the subnet isn't a supernet. That would
-                    # break it otherwise.
-                    if not npt.nptv6_prefix.subnet_of(nptv6_scope):
-                        continue
-                    # If the addresses overlap, it isn't free and cannot be used.
-                    if (
-                        npt.nptv6_prefix[0]
-                        >= candidate_nptv6_prefix[-1]
-                        >= npt.nptv6_prefix[-1]
-                        or npt.nptv6_prefix[0]
-                        <= candidate_nptv6_prefix[0]
-                        <= npt.nptv6_prefix[-1]
-                    ):
-                        free = False
-                        break
-
-                if not free:
+            # The first and last addresses of the prefixes in use. Check to be sure
+            # that the subnet isn't a supernet. That would break it otherwise.
+            used_ranges = [
+                (
+                    int(npt.nptv6_prefix.network_address),
+                    int(npt.nptv6_prefix.broadcast_address),
+                )
+                for npt in nptv6_list
+                if npt.nptv6_prefix and npt.nptv6_prefix.subnet_of(nptv6_scope)
+            ]
+            # Calculate the NPTv6 translations if not already calculated. The subnets
+            # of the scope are stepped through as integers and only the free one is
+            # turned into a network.
+            candidate_size = 1 << (128 - nptv6_prefix)
+            scope_first = int(nptv6_scope.network_address)
+            scope_end = int(nptv6_scope.broadcast_address) + 1
+            for candidate_first in range(
+                scope_first,
+                scope_end - candidate_size + 1,
+                candidate_size,
+            ):
+                candidate_last = candidate_first + candidate_size - 1
+                # If the addresses overlap, it isn't free and cannot be used.
+                if any(
+                    used_first >= candidate_last >= used_last
+                    or used_first <= candidate_first <= used_last
+                    for used_first, used_last in used_ranges
+                ):
                     continue
 
-                configured_nptv6.nptv6_prefix = candidate_nptv6_prefix
+                configured_nptv6.nptv6_prefix = ipaddress.IPv6Network(
+                    (candidate_first, nptv6_prefix),
+                )
                 updated = True
                 break
 
@@ -754,51 +815,45 @@ class NetworkInstanceDownlink(NetworkInstance):
             )
             return
         # configure NAT64 for the DOWNLINK network instance
-        try:
-            proc = pyroute2.NSPopen(
-                self.id,
-                # Stop Strongswan in the EXTERNAL network instance.
-                ["jool", "instance", "flush"],
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-            )
-            logger.info(
-                "Executing in network instance %s: %s",
-                self.id,
-                proc.args,
-            )
-        finally:
-            proc.wait()
-            proc.release()
-        try:
-            logger.info(
-                "Configuring network instance %s NAT64 scope %s",
-                self.id,
-                nat64_scope,
-            )
-            proc = pyroute2.NSPopen(
+        proc = subprocess.run(  # noqa: S603
+            ["/usr/sbin/ip", "netns", "exec", self.id, "jool", "instance", "flush"],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            check=False,
+        )
+        logger.info(
+            "Executing in network instance %s: %s",
+            self.id,
+            proc.args,
+        )
+        logger.info(
+            "Configuring network instance %s NAT64 scope %s",
+            self.id,
+            nat64_scope,
+        )
+        proc = subprocess.run(  # noqa: S603
+            [
+                "/usr/sbin/ip",
+                "netns",
+                "exec",
                 self.id,
-                # Stop Strongswan in the EXTERNAL network instance.
-                [
-                    "jool",
-                    "instance",
-                    "add",
-                    self.id,
-                    "--netfilter",
-                    "--pool6",
-                    str(nat64_scope),
-                ],
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-            )
-            logger.info(
-                "Executing in network instance %s: %s",
+                "jool",
+                "instance",
+                "add",
                 self.id,
-                proc.args,
-            )
-        finally:
-            proc.wait()
-            proc.release()
+                "--netfilter",
+                "--pool6",
+                str(nat64_scope),
+            ],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            check=False,
+        )
+        logger.info(
+            "Executing in network instance %s: %s",
+            self.id,
+            proc.args,
+        )
 
 
 class NetworkInstanceEndpoint(NetworkInstance):
@@ -840,7 +895,6 @@ class NetworkInstanceEndpoint(NetworkInstance):
         core_interfaces = [f"{self.id}_D"]
         downlink_interfaces = self._get_network_instance_connections()
 
-        iptables_template = TEMPLATES_ENV.get_template("iptables-endpoint.conf.j2")
         iptables_configs: dict[str, Any] = {
             "mode": mode,
             "network_instance_name": self.id,
@@ -848,18 +902,6 @@ class NetworkInstanceEndpoint(NetworkInstance):
             "downlink_interfaces": sorted(downlink_interfaces),
             "nptv6_networks": [],
         }
-        iptables_render = iptables_template.render(**iptables_configs)
-        logger.info(
-            "Configuring network instance %s iptables rules.",
-            self.id,
-        )
-        logger.debug(iptables_render)
-        proc = subprocess.run(  # noqa: S602
-            iptables_render,
-            stdout=subprocess.PIPE,
-            shell=True,
-            check=True,
-        )
-        logger.debug(proc.stdout)
+        self._apply_iptables(IPTABLES_ENDPOINT_TEMPLATE, iptables_configs)
 
         return False
@@ -2,15 +2,14 @@
 
 from __future__ import annotations
 
-import json
 import logging
-import subprocess
 from typing import TYPE_CHECKING, Any, Literal
 
 import pyroute2
 from pydantic import BaseModel, field_validator
 
 from vpnc.models import connections, enums
+from vpnc.network import interface
 
 if TYPE_CHECKING:
     import vpnc.models.network_instance
@@ -46,22 +45,18 @@ class ConnectionConfigPhysical(BaseModel):
         with pyroute2.NetNS(
             netns=network_instance.id,
         ) as ni_dl, pyroute2.IPRoute() as ni_default:
-            if not ni_dl.link_lookup(ifname=ifname):
-                if not ni_default.link_lookup(
-                    ifname=ifname,
-                ):
+            if not (ifidx := ni_dl.link_lookup(ifname=ifname)):
+                if not (ifidx_default := ni_default.link_lookup(ifname=ifname)):
                     logger.critical("Physical interface %s not found.", ifname)
                     raise ValueError
-                ifidx_default_phy = ni_default.link_lookup(
-                    ifname=ifname,
-                )[0]
                 ni_default.link(
                     "set",
-                    index=ifidx_default_phy,
+                    index=ifidx_default[0],
                     net_ns_fd=network_instance.id,
                 )
+                ifidx = ni_dl.link_lookup(ifname=ifname)
 
-            ifidx_phy = ni_dl.link_lookup(ifname=ifname)[0]
+            ifidx_phy = ifidx[0]
             ni_dl.flush_addr(index=ifidx_phy, scope=enums.IPRouteScope.GLOBAL.value)
             ni_dl.link(
                 "set",
@@ -99,10 +94,9 @@ class ConnectionConfigPhysical(BaseModel):
         interface_name = self.intf_name(network_instance, connection)
         # run the commands
         with pyroute2.NetNS(netns=network_instance.id) as ni_dl:
-            if not ni_dl.link_lookup(ifname=interface_name):
+            if not (ifidx := ni_dl.link_lookup(ifname=interface_name)):
                 return
-            ifidx = ni_dl.link_lookup(ifname=interface_name)[0]
-            ni_dl.link("set", index=ifidx, net_ns_fd=1)
+            ni_dl.link("set", index=ifidx[0], net_ns_fd=1)
 
     def intf_name(
         self,
@@ -119,22 +113,7 @@ class ConnectionConfigPhysical(BaseModel):
     ) -> dict[str, Any]:
         """Get the connection status."""
         if_name = self.intf_name(network_instance, connection)
-        output = json.loads(
-            subprocess.run(  # noqa: S603
-                [
-                    "/usr/sbin/ip",
-                    "--json",
-                    "--netns",
-                    network_instance.id,
-                    "address",
-                    "show",
-                    "dev",
-                    if_name,
-                ],
-                stdout=subprocess.PIPE,
-                check=True,
-            ).stdout,
-        )[0]
+        output = interface.get(network_instance.id, if_name)
 
         output_dict: dict[str, Any] = {
             "tenant": f"{network_instance.id.split('-')[0]}",
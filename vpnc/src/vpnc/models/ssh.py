@@ -2,7 +2,6 @@
 
 from __future__ import annotations
 
-import json
 import logging
 import subprocess
 from ipaddress import IPv4Address, IPv6Address
@@ -14,6 +13,7 @@ from pydantic import BaseModel, field_validator
 import vpnc.models.network_instance
 import vpnc.services.ssh
 from vpnc.models import connections, enums
+from vpnc.network import interface
 
 logger = logging.getLogger("vpnc")
 
@@ -55,9 +55,10 @@ class ConnectionConfigSSH(BaseModel):
         )
 
         with pyroute2.NetNS(netns=network_instance.id) as ni_dl:
-            if not ni_dl.link_lookup(ifname=tun):
+            if not (ifidx_tun := ni_dl.link_lookup(ifname=tun)):
                 ni_dl.link("add", ifname=tun, kind="tuntap", mode="tun")
-            ifidx: int = ni_dl.link_lookup(ifname=tun)[0]
+                ifidx_tun = ni_dl.link_lookup(ifname=tun)
+            ifidx: int = ifidx_tun[0]
             ni_dl.link("set", index=ifidx, state="up")
             ni_dl.flush_addr(index=ifidx, scope=enums.IPRouteScope.GLOBAL.value)
 
@@ -89,10 +90,9 @@ class ConnectionConfigSSH(BaseModel):
         vpnc.services.ssh.stop(network_instance, connection)
         interface_name = self.intf_name(network_instance, connection)
         with pyroute2.NetNS(netns=network_instance.id) as ni_dl:
-            if not ni_dl.link_lookup(ifname=interface_name):
+            if not (ifidx := ni_dl.link_lookup(ifname=interface_name)):
                 return
-            ifidx = ni_dl.link_lookup(ifname=interface_name)[0]
-            ni_dl.link("del", index=ifidx)
+            ni_dl.link("del", index=ifidx[0])
 
     def intf_name(
         self,
@@ -126,27 +126,12 @@ class ConnectionConfigSSH(BaseModel):
             text=True,
             check=False,
         )
-        logger.info(status_command.args)
-        logger.info(status_command.stdout, status_command.stderr)
+        logger.debug(status_command.args)
+        logger.debug("%s\n%s", status_command.stdout, status_command.stderr)
 
         status = "ACTIVE" if status_command.returncode == 0 else "INACTIVE"
 
-        output = json.loads(
-            subprocess.run(  # noqa: S603
-                [
-                    "/usr/sbin/ip",
-                    "--json",
-                    "--netns",
-                    network_instance.id,
-                    "address",
-                    "show",
-                    "dev",
-                    if_name,
-                ],
-                stdout=subprocess.PIPE,
-                check=True,
-            ).stdout,
-        )[0]
+        output = interface.get(network_instance.id, if_name)
 
         output_dict: dict[str, Any] = {
             "tenant": f"{network_instance.id.split('-')[0]}",
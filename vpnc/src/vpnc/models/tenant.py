@@ -42,6 +42,18 @@ if TYPE_CHECKING:
 
 logger = logging.getLogger("vpnc")
 
+# Use the libyaml based loader and dumper if PyYAML is built with it, it is a lot
+# faster.
+YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+YAML_DUMPER = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
+
+# Parsed configuration files by path, with the modification time and size of the
+# file when it was parsed.
+TENANT_CONFIG_CACHE: dict[
+    pathlib.Path,
+    tuple[tuple[int, int], Tenant | ServiceHub | ServiceEndpoint],
+] = {}
+
 
 class Tenant(BaseModel):
     """Define a tenant data structure."""
@@ -267,16 +279,26 @@ def load_tenant_config(
         logger.exception("Invalid filename found in %s. Skipping.", path)
         return None, None
     try:
-        with path.open(encoding="utf-8") as f:
-            try:
-                config_yaml = yaml.safe_load(f)
-            except (yaml.YAMLError, TypeError):
-                logger.critical(
-                    "Configuration is not valid '%s'.",
-                    path,
-                    exc_info=True,
-                )
-                sys.exit(1)
+        stat = path.stat()
+    except FileNotFoundError:
+        logger.critical(
+            "Configuration file could not be found at '%s'.",
+            path,
+            exc_info=True,
+        )
+        return None, None
+
+    # Parsing and validating the configuration is expensive. Reuse the result of
+    # the previous load if the file hasn't changed since.
+    file_state = (stat.st_mtime_ns, stat.st_size)
+    if (cached := TENANT_CONFIG_CACHE.get(path)) and cached[0] == file_state:
+        logger.debug("Configuration file %s is unchanged. Using cache.", path)
+        tenant = cached[1].model_copy(deep=True)
+        return tenant, config.VPNC_CONFIG_TENANT.get(tenant.id)
+
+    # The file is read in one go and decoded by the YAML parser itself.
+    try:
+        config_data = path.read_bytes()
     except FileNotFoundError:
         logger.critical(
             "Configuration file could not be found at '%s'.",
@@ -284,6 +306,15 @@ def load_tenant_config(
             exc_info=True,
         )
         return None, None
+    try:
+        config_yaml = yaml.load(config_data, Loader=YAML_LOADER)  # noqa: S506
+    except (yaml.YAMLError, TypeError):
+        logger.critical(
+            "Configuration is not valid '%s'.",
+            path,
+            exc_info=True,
+        )
+        sys.exit(1)
 
     try:
         tenant = Tenants(config=config_yaml).config
@@ -295,12 +326,24 @@ def load_tenant_config(
         )
         return None, None
 
+    cache_tenant_config(path, file_state, tenant)
+
     active_tenant = config.VPNC_CONFIG_TENANT.get(tenant.id)
     # config.VPNC_CONFIG_TENANT[tenant.id] = tenant
 
     return tenant, active_tenant
 
 
+def cache_tenant_config(
+    path: pathlib.Path,
+    file_state: tuple[int, int],
+    tenant: Tenant | ServiceHub | ServiceEndpoint,
+) -> None:
+    """Cache the configuration of a file with its modification time and size."""
+    # Store a copy, as the returned configuration may be modified by the caller.
+    TENANT_CONFIG_CACHE[path] = (file_state, tenant.model_copy(deep=True))
+
+
 def get_default_tenant() -> ServiceHub | ServiceEndpoint:
     """Return the default tenant configuration."""
     if not (default_tenant := config.VPNC_CONFIG_TENANT.get(config.DEFAULT_TENANT)):
@@ -3,7 +3,6 @@
 from __future__ import annotations
 
 import datetime
-import json
 import logging
 import subprocess
 from ipaddress import IPv4Address, IPv6Address
@@ -14,6 +13,7 @@ from pydantic import BaseModel, Field, field_validator
 
 from vpnc import config
 from vpnc.models import connections, enums
+from vpnc.network import interface
 from vpnc.services import wireguard
 
 if TYPE_CHECKING:
@@ -50,23 +50,24 @@ class ConnectionConfigWireGuard(BaseModel):
             network_instance,
         )
 
-        with pyroute2.NetNS(netns=network_instance.id) as ni_dl, pyroute2.NetNS(
-            netns=config.EXTERNAL_NI,
-        ) as ni_ext:
-            if not ni_dl.link_lookup(ifname=wg):
-                ni_ext.link(
-                    "add",
-                    ifname=wg,
-                    kind="wireguard",
-                )
-                ifid_ext_wg = ni_ext.link_lookup(ifname=wg)[0]
-                ni_ext.link(
-                    "set",
-                    index=ifid_ext_wg,
-                    net_ns_fd=network_instance.id,
-                )
-
-            ifidx_wg = ni_dl.link_lookup(ifname=wg)[0]
+        with pyroute2.NetNS(netns=network_instance.id) as ni_dl:
+            if not (ifidx := ni_dl.link_lookup(ifname=wg)):
+                # The EXTERNAL socket is only needed to create the interface.
+                with pyroute2.NetNS(netns=config.EXTERNAL_NI) as ni_ext:
+                    ni_ext.link(
+                        "add",
+                        ifname=wg,
+                        kind="wireguard",
+                    )
+                    ifid_ext_wg = ni_ext.link_lookup(ifname=wg)[0]
+                    ni_ext.link(
+                        "set",
+                        index=ifid_ext_wg,
+                        net_ns_fd=network_instance.id,
+                    )
+                ifidx = ni_dl.link_lookup(ifname=wg)
+
+            ifidx_wg = ifidx[0]
             ni_dl.flush_addr(index=ifidx_wg, scope=enums.IPRouteScope.GLOBAL.value)
 
             ni_dl.link(
@@ -104,10 +105,9 @@ class ConnectionConfigWireGuard(BaseModel):
         interface_name = self.intf_name(network_instance, connection)
         # run the commands
         with pyroute2.NetNS(netns=network_instance.id) as ni_dl:
-            if not ni_dl.link_lookup(ifname=interface_name):
+            if not (ifidx := ni_dl.link_lookup(ifname=interface_name)):
                 return
-            ifidx = ni_dl.link_lookup(ifname=interface_name)[0]
-            ni_dl.link("del", index=ifidx)
+            ni_dl.link("del", index=ifidx[0])
 
         config_file = config.WIREGUARD_CONFIG_DIR.joinpath(
             f"wg-{network_instance.id}-{connection.id}",
@@ -130,31 +130,23 @@ class ConnectionConfigWireGuard(BaseModel):
     ) -> dict[str, Any]:
         """Get the connection status."""
         if_name = self.intf_name(network_instance, connection)
-        output = json.loads(
-            subprocess.run(  # noqa: S603
-                [
-                    "/usr/sbin/ip",
-                    "--json",
-                    "--netns",
-                    network_instance.id,
-                    "address",
-                    "show",
-                    "dev",
-                    if_name,
-                ],
-                stdout=subprocess.PIPE,
-                check=True,
-            ).stdout,
-        )[0]
-
-        proc = pyroute2.NSPopen(
-            network_instance.id,
-            ["wg", "show", if_name, "dump"],
+        output = interface.get(network_instance.id, if_name)
+
+        proc = subprocess.run(  # noqa: S603
+            [
+                "/usr/sbin/ip",
+                "netns",
+                "exec",
+                network_instance.id,
+                "wg",
+                "show",
+                if_name,
+                "dump",
+            ],
             stdout=subprocess.PIPE,
+            check=False,
         )
-        wg_output, _ = proc.communicate()
-        proc.release()
-        wg_list = wg_output.split()
+        wg_list = proc.stdout.split()
         (
             priv,
             pub,
@@ -0,0 +1,53 @@
+"""Query network interfaces."""
+
+from __future__ import annotations
+
+import functools
+from typing import Any
+
+import pyroute2
+
+
+@functools.cache
+def _get_interfaces(network_instance_id: str) -> dict[str, dict[str, Any]]:
+    """Return the interfaces and their addresses in a network instance by name.
+
+    The network instance is queried once per process, so status overviews don't dump
+    the interfaces for every connection. This is only meant for short-lived commands.
+    """
+    with pyroute2.NetNS(network_instance_id) as netns:
+        return _dump_interfaces(netns)
+
+
+def _dump_interfaces(netns: pyroute2.NetNS) -> dict[str, dict[str, Any]]:
+    """Dump the interfaces in the same structure as 'ip --json address show'."""
+    interfaces: dict[str, dict[str, Any]] = {}
+    names: dict[int, str] = {}
+    for link in netns.get_links():
+        ifname: str = link.get_attr("IFLA_IFNAME")
+        names[link["index"]] = ifname
+        interfaces[ifname] = {
+            "ifname": ifname,
+            "operstate": link.get_attr("IFLA_OPERSTATE"),
+            "addr_info": [],
+        }
+    for addr in netns.get_addr():
+        if (ifname := names.get(addr["index"])) is None:
+            continue
+        # IPv6 addresses only have IFA_ADDRESS. For IPv4 point-to-point interfaces
+        # IFA_ADDRESS is the peer address.
+        interfaces[ifname]["addr_info"].append(
+            {
+                "local": addr.get_attr("IFA_LOCAL") or addr.get_attr("IFA_ADDRESS"),
+                "prefixlen": addr["prefixlen"],
+            },
+        )
+    return interfaces
+
+
+def get(network_instance_id: str, ifname: str) -> dict[str, Any]:
+    """Return an interface and its addresses as reported by 'ip --json address'."""
+    if not (interface := _get_interfaces(network_instance_id).get(ifname)):
+        msg = f"Interface '{ifname}' not found in '{network_instance_id}'"
+        raise ValueError(msg)
+    return interface
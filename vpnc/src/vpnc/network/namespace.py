@@ -3,15 +3,20 @@
 from __future__ import annotations
 
 import atexit
+import pathlib
+import threading
 
 from pyroute2 import netns
 
 
+def exists(name: str) -> bool:
+    """Check if a namespace exists without listing all namespaces."""
+    return pathlib.Path(netns.NETNS_RUN_DIR, name).exists()
+
+
 def add(name: str, cleanup: bool = False) -> str:  # noqa: FBT001, FBT002
     """Add a namespace to the system."""
-    ns_list = netns.listnetns()
-
-    if name not in ns_list:
+    if not exists(name):
         netns.create(name)
 
     if cleanup:
@@ -22,7 +27,29 @@ def add(name: str, cleanup: bool = False) -> str:  # noqa: FBT001, FBT002
 
 def delete(name: str) -> None:
     """Delete a namespace from the system."""
-    ns_list = netns.listnetns()
-
-    if name in ns_list:
+    if exists(name):
         netns.remove(name)
+
+
+def set_sysctl(name: str, settings: dict[str, str]) -> None:
+    """Set sysctl settings in a namespace without running sysctl.
+
+    setns only moves the calling thread, so a short-lived thread joins the namespace
+    and writes the settings to /proc/sys itself.
+    """
+    errors: list[Exception] = []
+
+    def write_settings() -> None:
+        try:
+            netns.setns(name, flags=0)
+            for key, value in settings.items():
+                path = pathlib.Path("/proc/sys", *key.split("."))
+                path.write_text(f"{value}\n", encoding="utf-8")
+        except Exception as err:  # noqa: BLE001
+            errors.append(err)
+
+    thread = threading.Thread(target=write_settings, name=f"vpnc-sysctl-{name}")
+    thread.start()
+    thread.join()
+    if errors:
+        raise errors[0]
@@ -3,15 +3,46 @@
 from __future__ import annotations
 
 import logging
+import socket
+from ipaddress import IPv4Network, IPv6Network, ip_address
 from typing import TYPE_CHECKING, Any, Literal
 
+from pyroute2.netlink.rtnl import rt_type
+
 logger = logging.getLogger("vpnc")
 
 if TYPE_CHECKING:
-    from ipaddress import IPv4Address, IPv4Network, IPv6Address, IPv6Network
+    from ipaddress import IPv4Address, IPv6Address
 
     import pyroute2
 
+# A route as (destination, type, gateway, output interface index).
+RouteKey = tuple[str, str, str | None, int | None]
+
+
+def dump(netns: pyroute2.NetNS) -> set[RouteKey]:
+    """Return the routes in the main routing table of a network instance."""
+    routes: set[RouteKey] = set()
+    for family, network in (
+        (socket.AF_INET, IPv4Network),
+        (socket.AF_INET6, IPv6Network),
+    ):
+        for rt in netns.get_routes(family=family, table=254):
+            dst = network((rt.get_attr("RTA_DST") or 0, rt["dst_len"]), strict=False)
+            gateway = rt.get_attr("RTA_GATEWAY")
+            route_type = rt_type.get(rt["type"], "unicast")
+            # IPv6 blackhole routes are reported on the loopback interface.
+            oif = None if route_type == "blackhole" else rt.get_attr("RTA_OIF")
+            routes.add(
+                (
+                    str(dst),
+                    route_type,
+                    str(ip_address(gateway)) if gateway else None,
+                    oif,
+                ),
+            )
+    return routes
+
 
 def command(
     netns: pyroute2.NetNS,
@@ -20,18 +51,49 @@ def command(
     type: Literal["blackhole"] | None = None,
     gateway: IPv4Address | IPv6Address | None = None,
     ifname: str | None = None,
+    current: set[RouteKey] | None = None,
+    oif: int | None = None,
 ) -> None:
-    """Perform route actions."""
+    """Perform route actions.
+
+    If *current* holds the routes as returned by dump, a replace is skipped when
+    the route is already present. *current* is updated after a successful replace.
+    If *oif* is the index of *ifname*, the interface isn't looked up again.
+    """
     route_params: dict[str, Any] = {
         k: str(v) for k, v in locals().items() if v is not None
     }
     route_params.pop("ifname", None)
-    if ifname:
-        if not netns.link_lookup(ifname=ifname):
+    route_params.pop("current", None)
+    if oif is None and ifname:
+        if not (ifidx := netns.link_lookup(ifname=ifname)):
             return
-        route_params["oif"] = netns.link_lookup(ifname=ifname)[0]
+        oif = ifidx[0]
+    if oif is not None:
+        route_params["oif"] = oif
+    route_key: RouteKey = (
+        str(dst),
+        type or "unicast",
+        str(gateway) if gateway else None,
+        route_params.get("oif"),
+    )
+    if command == "replace" and current is not None and route_key in current:
+        logger.debug(
+            "Route present for network instance: %s, route: %s via '%s/%s/%s'",
+            netns.netns,
+            dst,
+            type,
+            gateway,
+            ifname,
+        )
+        return
     try:
         netns.route(**route_params)
+        if command == "replace" and current is not None:
+            current.difference_update(
+                {i for i in current if i[0] == route_key[0]},
+            )
+            current.add(route_key)
         logger.info(
             "Operation '%s' succeeded for network instance: %s, route: %s via '%s/%s/%s'",
             command,
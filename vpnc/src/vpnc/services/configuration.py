@@ -2,23 +2,25 @@
 
 from __future__ import annotations
 
+import concurrent.futures
+import functools
 import logging
 import pathlib
+import queue
 import subprocess
-import time
-from ipaddress import AddressValueError, IPv4Network, IPv6Address, IPv6Network
-from typing import TYPE_CHECKING
+import threading
+from ipaddress import AddressValueError, IPv4Network, IPv6Network
+from typing import TYPE_CHECKING, Any
 
 import yaml
 from watchdog.events import (
     FileSystemEvent,
     RegexMatchingEventHandler,
 )
-from watchdog.observers import Observer
 
 import vpnc.models.network_instance
 import vpnc.models.tenant
-from vpnc import config
+from vpnc import config, shared
 from vpnc.models import enums, info
 from vpnc.services import frr, vpncmangle
 
@@ -27,34 +29,75 @@ if TYPE_CHECKING:
 
 logger = logging.getLogger("vpnc")
 
+# The modification time and size of each tenant configuration file when it was last
+# applied.
+APPLIED_CONFIG_STATE: dict[pathlib.Path, tuple[int, int]] = {}
 
-def observe_configuration() -> BaseObserver:
+
+def observe_configuration() -> BaseObserver:  # noqa: C901
     """Create the observer for DOWNLINK network instances configuration."""
 
     # Define what should happen when DOWNLINK files are created, modified or deleted.
     class ConfigurationHandler(RegexMatchingEventHandler):
-        """Handler for the event monitoring."""
+        """Handler for the event monitoring.
+
+        Events are not handled directly. They are queued and a single worker handles
+        each changed file once a burst of events has passed.
+        """
+
+        def __init__(self, *args: Any, **kwargs: Any) -> None:  # noqa: ANN401
+            super().__init__(*args, **kwargs)
+            self.events: queue.Queue[str] = queue.Queue()
+            worker = threading.Thread(target=self.configuration_worker, daemon=True)
+            worker.start()
 
         def on_created(self, event: FileSystemEvent) -> None:
             logger.info("File %s: %s", event.event_type, event.src_path)
-            config_file_path = pathlib.Path(event.src_path)
-            time.sleep(0.1)
-            manage_tenant(config_file_path)
+            self.events.put(event.src_path)
 
         def on_modified(self, event: FileSystemEvent) -> None:
             logger.info("File %s: %s", event.event_type, event.src_path)
-            config_file_path = pathlib.Path(event.src_path)
-            time.sleep(0.1)
-            manage_tenant(config_file_path)
+            self.events.put(event.src_path)
+
+        def on_closed(self, event: FileSystemEvent) -> None:
+            logger.info("File %s: %s", event.event_type, event.src_path)
+            self.events.put(event.src_path)
+
+        def on_moved(self, event: FileSystemEvent) -> None:
+            logger.info(
+                "File %s: %s to %s",
+                event.event_type,
+                event.src_path,
+                event.dest_path,
+            )
+            # Either side of the move may be a temporary file, for example when an
+            # editor saves a file.
+            for path in (event.src_path, event.dest_path):
+                if any(regex.match(path) for regex in self.regexes):
+                    self.events.put(path)
 
         def on_deleted(self, event: FileSystemEvent) -> None:
             logger.info("File %s: %s", event.event_type, event.src_path)
-            config_file_path = pathlib.Path(event.src_path)
-            time.sleep(0.1)
-            delete_downlink_tenant(config_file_path)
+            self.events.put(event.src_path)
+
+        def configuration_worker(self) -> None:
+            """Handle each changed file once per burst of file events."""
+            while not shared.STOP_EVENT.is_set():
+                try:
+                    paths = {self.events.get(timeout=1): None}
+                except queue.Empty:
+                    continue
+                # Editors and watchdog emit multiple events for a single save. Collect
+                # the events that arrive in quick succession.
+                while True:
+                    try:
+                        paths[self.events.get(timeout=0.3)] = None
+                    except queue.Empty:
+                        break
+                apply_tenant_configs([pathlib.Path(path) for path in paths])
 
     # Create the observer object. This doesn't start the handler.
-    observer: BaseObserver = Observer()
+    observer = shared.create_observer(config.VPNC_A_CONFIG_DIR)
 
     # Configure the event handler that watches directories.
     # This doesn't start the handler.
@@ -65,6 +108,7 @@ def observe_configuration() -> BaseObserver:
         ),
         path=config.VPNC_A_CONFIG_DIR,
         recursive=False,
+        event_filter=shared.get_event_filter(observer),
     )
     # The handler should exit on main thread close
     observer.daemon = True
@@ -72,6 +116,57 @@ def observe_configuration() -> BaseObserver:
     return observer
 
 
+def apply_tenant_configs(paths: list[pathlib.Path]) -> None:
+    """Apply or remove multiple tenant configuration files.
+
+    The DEFAULT tenant is handled first, the other tenants don't depend on each
+    other and are handled concurrently.
+    """
+
+    def handle_configuration(path: pathlib.Path) -> None:
+        try:
+            apply_tenant_config(path)
+        except Exception:
+            logger.exception("Failed to handle configuration %s", path)
+
+    default_paths = [x for x in paths if x.stem == config.DEFAULT_TENANT]
+    for path in default_paths:
+        handle_configuration(path)
+    with concurrent.futures.ThreadPoolExecutor(
+        max_workers=config.TENANT_SETUP_WORKERS,
+        thread_name_prefix="vpnc-tenant",
+    ) as executor:
+        list(
+            executor.map(
+                handle_configuration,
+                (x for x in paths if x not in default_paths),
+            ),
+        )
+
+
+def apply_tenant_config(path: pathlib.Path) -> None:
+    """Apply a tenant configuration file if it changed since it was last applied.
+
+    The tenant is removed if the file doesn't exist anymore.
+    """
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        APPLIED_CONFIG_STATE.pop(path, None)
+        delete_downlink_tenant(path)
+        return
+    # Files are also reported when they are opened for writing and closed without
+    # any change.
+    file_state = (stat.st_mtime_ns, stat.st_size)
+    if APPLIED_CONFIG_STATE.get(path) == file_state:
+        logger.debug("Configuration %s is unchanged.", path)
+        return
+    APPLIED_CONFIG_STATE.pop(path, None)
+    manage_tenant(path)
+    # Unless the configuration was written back to the file, it's applied as read.
+    APPLIED_CONFIG_STATE.setdefault(path, file_state)
+
+
 def manage_tenant(path: pathlib.Path) -> None:
     """Configure tenants."""
     default_tenant = vpnc.models.tenant.get_default_tenant()
@@ -85,6 +180,12 @@ def manage_tenant(path: pathlib.Path) -> None:
     if not tenant:
         return
 
+    if path.stem == config.DEFAULT_TENANT:
+        # The scopes are keyed on the prefixes, but entries for the old prefixes
+        # won't be used again.
+        _calculate_nat64_scope.cache_clear()
+        _calculate_nptv6_scope.cache_clear()
+
     if default_tenant.mode == enums.ServiceMode.ENDPOINT and not getattr(
         tenant,
         "mode",
@@ -110,22 +211,32 @@ def manage_tenant(path: pathlib.Path) -> None:
 
     # Calculate network instances that need to be removed and remove them.
     ni_remove = active_network_instance_ids.difference(network_instance_ids)
-    for ni in ni_remove:
-        delete_active_ni = active_tenant_network_instances.pop(ni, None)
-        if delete_active_ni is None:
-            continue
+    delete_active_nis = [
+        delete_active_ni
+        for ni in ni_remove
+        if (delete_active_ni := active_tenant_network_instances.pop(ni, None))
+        is not None
+    ]
 
+    # DOWNLINK network instances don't depend on each other and each has its own
+    # lock, so they are set up and removed concurrently. The DEFAULT tenant network
+    # instances depend on each other and are handled in order.
+    workers = 1 if tenant.id == config.DEFAULT_TENANT else config.NI_SETUP_WORKERS
+    with concurrent.futures.ThreadPoolExecutor(
+        max_workers=workers,
+        thread_name_prefix="vpnc-ni",
+    ) as executor:
         # run the network instance remove commands
-        delete_active_ni.delete()
+        list(executor.map(lambda ni: ni.delete(), delete_active_nis))
 
-    logger.info("Setting up tenant %s.", tenant.id)
+        logger.info("Setting up tenant %s.", tenant.id)
 
-    update_check: list[bool] = [
-        network_instance.set(
-            active_tenant_network_instances.get(network_instance.id),
+        update_check: list[bool] = list(
+            executor.map(
+                lambda ni: ni.set(active_tenant_network_instances.get(ni.id)),
+                tenant.network_instances.values(),
+            ),
         )
-        for network_instance in tenant.network_instances.values()
-    ]
 
     config.VPNC_CONFIG_TENANT[tenant.id] = tenant
     if (
@@ -144,25 +255,29 @@ def manage_tenant(path: pathlib.Path) -> None:
             "candidate",
             file_name,
         )
+        output = tenant.model_dump(mode="json")
+        try:
+            output_yaml = yaml.dump(
+                output,
+                Dumper=vpnc.models.tenant.YAML_DUMPER,
+                explicit_start=True,
+                explicit_end=True,
+            )
+        except yaml.YAMLError:
+            logger.exception("Invalid YAML found in %s. Skipping.", path)
+            return
         with path.open("w", encoding="utf-8") as fha, candidate_config.open(
             "w",
             encoding="utf-8",
         ) as fhb:
-            output = tenant.model_dump(mode="json")
-            try:
-                fha.write(
-                    yaml.safe_dump(output, explicit_start=True, explicit_end=True),
-                )
-            except yaml.YAMLError:
-                logger.exception("Invalid YAML found in %s. Skipping.", path)
-                return
-            try:
-                fhb.write(
-                    yaml.safe_dump(output, explicit_start=True, explicit_end=True),
-                )
-            except yaml.YAMLError:
-                logger.exception("Invalid YAML found in %s. Skipping.", path)
-                return
+            fha.write(output_yaml)
+            fhb.write(output_yaml)
+        # The file contains this configuration now. Cache it, so the file doesn't
+        # have to be parsed again when the observer picks up the change.
+        stat = path.stat()
+        file_state = (stat.st_mtime_ns, stat.st_size)
+        vpnc.models.tenant.cache_tenant_config(path, file_state, tenant)
+        APPLIED_CONFIG_STATE[path] = file_state
 
 
 def delete_downlink_tenant(path: pathlib.Path) -> None:
@@ -196,20 +311,21 @@ def delete_downlink_tenant(path: pathlib.Path) -> None:
             " configuration files other than DEFAULT. Ignoring.",
         )
 
+    # Remove all VPN configurations first, so the swanctl observer reloads them once
+    # instead of once per network instance.
     for ni in active_network_instances:
-        # remove VPN configs if exist
         logger.info(
             "Removing VPN configuration for network instance '%s' connection.",
             ni.id,
-            # connection.id,
         )
         downlink_path = config.IPSEC_CONFIG_DIR.joinpath(f"{ni.id}.conf")
         downlink_path.unlink(missing_ok=True)
-        time.sleep(0.1)
+    for ni in active_network_instances:
         # run the network instance remove commands
         ni.delete()
 
     config.VPNC_CONFIG_TENANT.pop(tenant_id, None)
+    vpnc.models.tenant.TENANT_CONFIG_CACHE.pop(path, None)
 
     # Remove routes when the tenant is deleted.
     if default_tenant.mode == enums.ServiceMode.HUB:
@@ -236,16 +352,30 @@ def get_network_instance_nat64_scope(
         network_instance.id,
     )
 
-    tenant_ext = ni_info.tenant_ext_str  # c, d, e, f
-    tenant_id = ni_info.tenant_id  # remote identifier
-    network_instance_id = ni_info.network_instance_id  # connection number
+    return _calculate_nat64_scope(
+        ni_info.tenant_ext,  # c, d, e, f
+        ni_info.tenant_id,  # remote identifier
+        ni_info.network_instance_id,  # connection number
+        int(default_tenant.prefix_downlink_nat64.network_address),
+    )
+
 
-    nat64_prefix = default_tenant.prefix_downlink_nat64
-    nat64_network_address = int(nat64_prefix[0])
-    offset = f"0:0:{tenant_ext}:{tenant_id:x}:{network_instance_id}::"
-    nat64_offset = int(IPv6Address(offset))
-    nat64_address = IPv6Address(nat64_network_address + nat64_offset)
-    return IPv6Network(nat64_address).supernet(new_prefix=96)
+@functools.lru_cache(maxsize=4096)
+def _calculate_nat64_scope(
+    tenant_ext: int,
+    tenant_id: int,
+    network_instance_id: int,
+    nat64_network_address: int,
+) -> IPv6Network:
+    """Calculate the NAT64 scope. The result only depends on the arguments."""
+    # The offset is '0:0:<tenant_ext>:<tenant_id>:<network_instance_id>::'. The
+    # network instance identifier is written in decimal but read as hexadecimal.
+    nat64_offset = (
+        (tenant_ext << 80)
+        | (tenant_id << 64)
+        | (int(str(network_instance_id), 16) << 48)
+    )
+    return IPv6Network((nat64_network_address + nat64_offset, 96), strict=False)
 
 
 def get_network_instance_nptv6_scope(
@@ -269,39 +399,62 @@ def get_network_instance_nptv6_scope(
         network_instance_name,
     )
 
-    tenant_ext = ni_info.tenant_ext_str
-    tenant_id = ni_info.tenant_id
-    network_instance_id = ni_info.network_instance_id
+    return _calculate_nptv6_scope(
+        ni_info.tenant_ext,
+        ni_info.tenant_id,
+        ni_info.network_instance_id,
+        int(default_tenant.prefix_downlink_nptv6.network_address),
+    )
+
 
-    nptv6_superscope = default_tenant.prefix_downlink_nptv6
-    nptv6_network_address = int(nptv6_superscope[0])
-    offset = f"{tenant_ext}:{tenant_id:x}:{network_instance_id}::"
-    nptv6_offset = int(IPv6Address(offset))
-    nptv6_address = IPv6Address(nptv6_network_address + nptv6_offset)
-    return IPv6Network(nptv6_address).supernet(new_prefix=48)
+@functools.lru_cache(maxsize=4096)
+def _calculate_nptv6_scope(
+    tenant_ext: int,
+    tenant_id: int,
+    network_instance_id: int,
+    nptv6_network_address: int,
+) -> IPv6Network:
+    """Calculate the NPTv6 scope. The result only depends on the arguments."""
+    # The offset is '<tenant_ext>:<tenant_id>:<network_instance_id>::'. The network
+    # instance identifier is written in decimal but read as hexadecimal.
+    nptv6_offset = (
+        (tenant_ext << 112)
+        | (tenant_id << 96)
+        | (int(str(network_instance_id), 16) << 80)
+    )
+    return IPv6Network((nptv6_network_address + nptv6_offset, 48), strict=False)
 
 
 def get_network_instance_nat64_mappings_state(
     network_instance_name: str,
 ) -> tuple[IPv6Network, IPv4Network] | None:
     """Retrieve the live NAT64 mapping configured in Jool."""
-    proc = subprocess.run(  # noqa: S602
-        (
-            f"/usr/sbin/ip netns exec {network_instance_name}"
-            f" jool --instance {network_instance_name} global display |"
-            " grep pool6 |"
-            " awk '{ print $2 }'"
-        ),
+    proc = subprocess.run(  # noqa: S603
+        [
+            "/usr/sbin/ip",
+            "netns",
+            "exec",
+            network_instance_name,
+            "jool",
+            "--instance",
+            network_instance_name,
+            "global",
+            "display",
+        ],
         capture_output=True,
         text=True,
-        shell=True,
         check=False,
     )
 
-    if not proc.stdout.strip():
+    # The pool6 line reads 'pool6: <prefix>'.
+    pool6 = next(
+        (x.split() for x in proc.stdout.splitlines() if "pool6" in x),
+        [],
+    )
+    if len(pool6) < 2:  # noqa: PLR2004
         return None
     try:
-        return IPv6Network(proc.stdout.strip()), IPv4Network("0.0.0.0/0")
+        return IPv6Network(pool6[1]), IPv4Network("0.0.0.0/0")
     except AddressValueError:
         return None
 
@@ -310,25 +463,30 @@ def get_network_instance_nptv6_mappings_state(
     network_instance_name: str,
 ) -> list[tuple[IPv6Network, IPv6Network]]:
     """Retrieve the live NPTv6 mapping configured in ip6tables."""
-    proc = subprocess.run(  # noqa: S602
-        (
-            f"/usr/sbin/ip netns exec {network_instance_name}"
-            " ip6tables -t nat -L |"
-            " grep NETMAP |"
-            " awk '{print $5,$6}'"
-        ),
+    proc = subprocess.run(  # noqa: S603
+        [
+            "/usr/sbin/ip",
+            "netns",
+            "exec",
+            network_instance_name,
+            "ip6tables",
+            "-t",
+            "nat",
+            "-L",
+        ],
         stdout=subprocess.PIPE,
-        shell=True,
+        text=True,
         check=False,
     )
 
     output: list[tuple[IPv6Network, IPv6Network]] = []
 
-    if not proc.stdout:
-        return output
     try:
-        for mapping_str in proc.stdout.decode().strip().split("\n"):
-            mapping: list[str] = mapping_str.split()
+        for mapping_str in proc.stdout.splitlines():
+            if "NETMAP" not in mapping_str:
+                continue
+            # The source and destination are the fifth and sixth columns.
+            mapping: list[str] = mapping_str.split()[4:6]
             local = IPv6Network(mapping[0])
             remote = IPv6Network(mapping[1].split("to:", maxsplit=1)[1])
 
@@ -3,16 +3,17 @@
 import atexit
 import logging
 import pathlib
+import queue
+import socket
 import subprocess
+import threading
 import time
 from typing import TYPE_CHECKING, Any
 
-from jinja2 import Environment, FileSystemLoader
 from watchdog.events import FileSystemEvent, PatternMatchingEventHandler
-from watchdog.observers import Observer
 from watchdog.observers.api import BaseObserver
 
-from vpnc import config
+from vpnc import config, shared
 from vpnc.models import enums, tenant
 
 if TYPE_CHECKING:
@@ -22,57 +23,116 @@ logger = logging.getLogger("vpnc")
 
 BASE_DIR = pathlib.Path(__file__).parent
 TEMPLATES_DIR = BASE_DIR.joinpath("templates")
-TEMPLATES_ENV = Environment(loader=FileSystemLoader(TEMPLATES_DIR), autoescape=True)
-
-
-def observe() -> BaseObserver:
+TEMPLATES_ENV = shared.get_templates_env(TEMPLATES_DIR)
+FRR_TEMPLATE = TEMPLATES_ENV.get_template("frr.conf.j2")
+# The daemons that must accept connections before the configuration is loaded.
+FRR_VTY_SOCKETS = (
+    pathlib.Path("/var/run/frr/zebra.vty"),
+    pathlib.Path("/var/run/frr/bgpd.vty"),
+)
+# Seconds to wait for the daemons after starting FRR.
+FRR_START_TIMEOUT = 10
+
+
+def observe() -> BaseObserver:  # noqa: C901
     """Create the observer for FRR configuration changes."""
 
     # Define what should happen when the config file with CORE data is modified.
     class FRRHandler(PatternMatchingEventHandler):
-        """Handler for the event monitoring."""
+        """Handler for the event monitoring.
+
+        Events are not handled directly. They are queued and a single worker reloads
+        the configuration once a burst of events has passed.
+        """
+
+        def __init__(self, *args: Any, **kwargs: Any) -> None:  # noqa: ANN401
+            super().__init__(*args, **kwargs)
+            self.events: queue.Queue[str] = queue.Queue()
+            self.loaded_config: bytes | None = None
+            worker = threading.Thread(target=self.reload_worker, daemon=True)
+            worker.start()
 
         def on_created(self, event: FileSystemEvent) -> None:
             logger.info("File %s: %s", event.event_type, event.src_path)
-            time.sleep(0.1)
-            self.reload_config()
+            self.events.put(event.src_path)
 
         def on_modified(self, event: FileSystemEvent) -> None:
             logger.info("File %s: %s", event.event_type, event.src_path)
-            time.sleep(0.1)
-            self.reload_config()
+            self.events.put(event.src_path)
+
+        def on_closed(self, event: FileSystemEvent) -> None:
+            logger.info("File %s: %s", event.event_type, event.src_path)
+            self.events.put(event.src_path)
+
+        def on_moved(self, event: FileSystemEvent) -> None:
+            logger.info(
+                "File %s: %s to %s",
+                event.event_type,
+                event.src_path,
+                event.dest_path,
+            )
+            self.events.put(event.dest_path)
 
         def on_deleted(self, event: FileSystemEvent) -> None:
             logger.info("File %s: %s", event.event_type, event.src_path)
-            time.sleep(0.1)
-            self.reload_config()
+            self.events.put(event.src_path)
+
+        def reload_worker(self) -> None:
+            """Reload the configuration once per burst of file events."""
+            while not shared.STOP_EVENT.is_set():
+                try:
+                    self.events.get(timeout=1)
+                except queue.Empty:
+                    continue
+                # Every network instance that is set up regenerates the configuration.
+                while True:
+                    try:
+                        self.events.get(timeout=0.25)
+                    except queue.Empty:
+                        break
+                try:
+                    self.reload_config()
+                except Exception:
+                    logger.exception("Failed to reload the FRR configuration.")
 
         def reload_config(self) -> None:
             """Load FRR config from file in an idempotent way."""
-            # Wait to make sure the file is written
+            # The configuration is regenerated often without any change.
+            try:
+                frr_config = config.FRR_CONFIG_PATH.read_bytes()
+            except FileNotFoundError:
+                frr_config = None
+            if frr_config is not None and frr_config == self.loaded_config:
+                logger.debug("No FRR configuration changes. Skipping reload.")
+                return
 
             logger.info("Reloading FRR configuration.")
+            # The output is only logged at debug level. The errors are kept for the
+            # exception if the reload fails.
+            debug = logger.isEnabledFor(logging.DEBUG)
             proc = subprocess.run(  # noqa: S603
                 [
                     "/usr/lib/frr/frr-reload.py",
                     "/etc/frr/frr.conf",
                     "--reload",
                 ],
-                capture_output=True,
+                stdout=subprocess.PIPE if debug else subprocess.DEVNULL,
+                stderr=subprocess.PIPE,
                 check=True,
             )
-            logger.debug(proc.stdout)
-            # Wait to make sure the configuration is applied
-            time.sleep(1)
+            if debug:
+                logger.debug(proc.stdout)
+            self.loaded_config = frr_config
 
     # Create the observer object. This doesn't start the handler.
-    observer: BaseObserver = Observer()
+    observer = shared.create_observer(config.FRR_CONFIG_PATH.parent)
     # Configure the event handler that watches directories.
     # This doesn't start the handler.
     observer.schedule(
         event_handler=FRRHandler(patterns=["frr.conf"], ignore_directories=True),
         path=config.FRR_CONFIG_PATH.parent,
         recursive=False,
+        event_filter=shared.get_event_filter(observer),
     )
     # The handler should exit on main thread close
     observer.daemon = True
@@ -98,7 +158,6 @@ def generate_config() -> None:
         neighbors.append(neighbor_cfg)
 
     # FRR/BGP CONFIG
-    frr_template = TEMPLATES_ENV.get_template("frr.conf.j2")
     # Subnets expected on the CORE side
     prefix_core: list[IPv4Network | IPv6Network] = []
     for connection in net_instance.connections.values():
@@ -117,11 +176,22 @@ def generate_config() -> None:
     }
 
     logger.info("Generating FRR configuration.")
-    frr_render = frr_template.render(**frr_cfg)
-    logger.debug(frr_render)
+    # Only build the configuration as a string when it's going to be logged. It's
+    # streamed to the file otherwise.
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(FRR_TEMPLATE.render(**frr_cfg))
+    with shared.FRR_LOCK:
+        shared.write_template(FRR_TEMPLATE, config.FRR_CONFIG_PATH, frr_cfg)
+
 
-    with config.FRR_CONFIG_PATH.open("w+", encoding="utf-8") as f:
-        f.write(frr_render)
+def _vty_available(path: pathlib.Path) -> bool:
+    """Check if an FRR daemon accepts connections on its VTY socket."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        try:
+            sock.connect(str(path))
+        except OSError:
+            return False
+    return True
 
 
 def stop() -> None:
@@ -129,9 +199,8 @@ def stop() -> None:
     logger.info("Stopping FRR process.")
     proc = subprocess.Popen(  # noqa: S603
         ["/usr/lib/frr/frrinit.sh", "stop"],
-        stdout=subprocess.PIPE,
-        stderr=subprocess.STDOUT,
-        shell=False,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
     )
     logger.info(proc.args)
 
@@ -144,17 +213,31 @@ def start() -> None:
     logger.debug("Unlinking FRR config file %s at startup", config.FRR_CONFIG_PATH)
     config.FRR_CONFIG_PATH.unlink(missing_ok=True)
 
-    logger.info("Starting FRR process.")
-    proc = subprocess.Popen(  # noqa: S603
-        ["/usr/lib/frr/frrinit.sh", "start"],
-        stdout=subprocess.PIPE,
-        stderr=subprocess.STDOUT,
-    )
-    logger.debug(proc.args)
-    time.sleep(5)
     atexit.register(stop)
-
-    proc.wait()
+    # A running FRR, e.g. when only VPNC was restarted, loads the new configuration
+    # through the observer. Restarting it would only interrupt routing.
+    if all(_vty_available(path) for path in FRR_VTY_SOCKETS):
+        logger.info("FRR process is already running.")
+    else:
+        logger.info("Starting FRR process.")
+        proc = subprocess.Popen(  # noqa: S603
+            ["/usr/lib/frr/frrinit.sh", "start"],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        logger.debug(proc.args)
+        proc.wait()
+
+        # Wait until the daemons accept connections instead of for a fixed time.
+        deadline = time.monotonic() + FRR_START_TIMEOUT
+        while not all(_vty_available(path) for path in FRR_VTY_SOCKETS):
+            if time.monotonic() >= deadline:
+                logger.warning(
+                    "FRR daemons not available after %s seconds.",
+                    FRR_START_TIMEOUT,
+                )
+                break
+            time.sleep(0.05)
 
     # FRR doesn't monitor for file config changes directly, so a file observer is
     # used to auto reload the configuration.
@@ -4,7 +4,6 @@ from __future__ import annotations
 
 import atexit
 import logging
-from ipaddress import IPv4Address, IPv6Address, IPv6Network
 from typing import TYPE_CHECKING, Any, Callable
 
 import pyroute2
@@ -19,6 +18,8 @@ from vpnc.services import configuration
 from vpnc.shared import NI_LOCK
 
 if TYPE_CHECKING:
+    from ipaddress import IPv6Network
+
     import vpnc.models.network_instance
 
 logger = logging.getLogger("vpnc")
@@ -65,22 +66,11 @@ def create_handler(network_instance_id: str) -> Callable[..., None]:
                 net_inst = tenant.network_instances.get(network_instance_id)
 
         active_net_inst, ni_handler = NI_ROUTE_MONITORS[network_instance_id]
-        ni_dl = pyroute2.NetNS(network_instance_id)
-        ni_core = pyroute2.NetNS(config.CORE_NI)
 
         connection: vpnc.models.connections.Connection | None = None
         active_connection: vpnc.models.connections.Connection | None = None
         connection_name_downlink: str = event["attrs"][0][1]
 
-        try:
-            ifidx = ni_dl.link_lookup(ifname=connection_name_downlink)
-            if intf := ni_dl.get_links(*ifidx):
-                interface_state: str = intf[0].get("state", event["state"])
-            else:
-                interface_state = event["state"]
-        except AttributeError:
-            interface_state = event["state"]
-
         if net_inst:
             for conn in net_inst.connections.values():
                 if connection_name_downlink == conn.intf_name(net_inst):
@@ -93,6 +83,29 @@ def create_handler(network_instance_id: str) -> Callable[..., None]:
                     active_connection = conn
                     break
 
+        # Skip opening the namespaces for events that can't result in route changes:
+        # links that aren't connections, and CORE links coming up or going down in
+        # HUB mode, as those routes aren't managed.
+        if (not connection and not active_connection) or (
+            connection_event == "RTM_NEWLINK"
+            and network_instance_id == config.CORE_NI
+            and default_tenant.mode == enums.ServiceMode.HUB
+        ):
+            NI_ROUTE_MONITORS[network_instance_id] = (net_inst, ni_handler)
+            return
+
+        ni_dl = pyroute2.NetNS(network_instance_id)
+        ni_core = pyroute2.NetNS(config.CORE_NI)
+
+        try:
+            ifidx = ni_dl.link_lookup(ifname=connection_name_downlink)
+            if intf := ni_dl.get_links(*ifidx):
+                interface_state: str = intf[0].get("state", event["state"])
+            else:
+                interface_state = event["state"]
+        except AttributeError:
+            interface_state = event["state"]
+
         logger.info("Acquiring lock for %s", network_instance_id)
         with ni_dl, ni_core, NI_LOCK[network_instance_id]:
             # Connection is deleted
@@ -148,19 +161,20 @@ def set_routes_up(
     ):
         return
 
+    # The network instance type doesn't change per route.
+    is_downlink = net_inst.type == enums.NetworkInstanceType.DOWNLINK
+    is_endpoint = net_inst.type == enums.NetworkInstanceType.ENDPOINT
     interface_name_downlink = connection.intf_name(net_inst)
     interface_name_core = f"{net_inst.id}_C"
 
-    interfaces_all_up_list: list[bool] = []
-    for conn in net_inst.connections.values():
-        ifidx = ni_dl.link_lookup(ifname=conn.intf_name(net_inst))
-        if intf := ni_dl.get_links(*ifidx):
-            interfaces_all_up_list.append(intf[0].get("state", "down") == "up")
-            continue
-        interfaces_all_up_list.append(False)
-
+    # Dump the links once instead of looking up the interface of every connection.
+    link_states: dict[str, str] = {
+        link.get_attr("IFLA_IFNAME"): link.get("state", "down")
+        for link in ni_dl.get_links()
+    }
     interfaces_all_up: bool = all(
-        interfaces_all_up_list,
+        link_states.get(conn.intf_name(net_inst)) == "up"
+        for conn in net_inst.connections.values()
     )
 
     nat64_scope = configuration.get_network_instance_nat64_scope(net_inst)
@@ -169,6 +183,12 @@ def set_routes_up(
     # are correct.
     if active_connection and connection != active_connection:
         delete_all_routes(ni_dl, ni_core, net_inst, active_connection)
+    # Routes that are already correct are left alone, e.g. after an SA rekey.
+    routes_dl = route.dump(ni_dl)
+    routes_core = route.dump(ni_core)
+    # Look up the interfaces once instead of for every route.
+    oif_downlink = next(iter(ni_dl.link_lookup(ifname=interface_name_downlink)), None)
+    oif_core = next(iter(ni_core.link_lookup(ifname=interface_name_core)), None)
     for route6 in connection.routes.ipv6:
         # routes in current the namespace
         route.command(
@@ -177,18 +197,13 @@ def set_routes_up(
             dst=route6.to,
             gateway=route6.via,
             ifname=interface_name_downlink,
+            current=routes_dl,
+            oif=oif_downlink,
         )
         # routes in CORE for downlink
-        if net_inst.type in (
-            enums.NetworkInstanceType.DOWNLINK,
-            enums.NetworkInstanceType.ENDPOINT,
-        ):
+        if is_downlink or is_endpoint:
             adv6_route_up = None
-            if (
-                net_inst.type == enums.NetworkInstanceType.DOWNLINK
-                and route6.nptv6
-                and interfaces_all_up
-            ):
+            if is_downlink and route6.nptv6 and interfaces_all_up:
                 adv6_route_up = route6.nptv6_prefix
             elif interfaces_all_up:
                 adv6_route_up = route6.to
@@ -199,8 +214,10 @@ def set_routes_up(
                 ni_core,
                 "replace",
                 dst=adv6_route_up,
-                gateway=IPv6Address("fe80::1"),
+                gateway=config.VETH_DOWNLINK_IPV6,
                 ifname=interface_name_core,
+                current=routes_core,
+                oif=oif_core,
             )
 
     for route4 in connection.routes.ipv4:
@@ -211,27 +228,29 @@ def set_routes_up(
             dst=route4.to,
             gateway=route4.via,
             ifname=interface_name_downlink,
+            current=routes_dl,
+            oif=oif_downlink,
         )
         # routes in CORE for downlink
-        if net_inst.type == enums.NetworkInstanceType.ENDPOINT:
+        if is_endpoint:
             route.command(
                 ni_core,
                 "replace",
                 dst=route4.to,
-                gateway=IPv4Address("169.254.0.2"),
+                gateway=config.VETH_DOWNLINK_IPV4,
                 ifname=interface_name_core,
+                current=routes_core,
+                oif=oif_core,
             )
-    if (
-        nat64_scope
-        and net_inst.type == enums.NetworkInstanceType.DOWNLINK
-        and interfaces_all_up
-    ):
+    if nat64_scope and is_downlink and interfaces_all_up:
         route.command(
             ni_core,
             "replace",
             dst=nat64_scope,
-            gateway=IPv6Address("fe80::1"),
+            gateway=config.VETH_DOWNLINK_IPV6,
             ifname=interface_name_core,
+            current=routes_core,
+            oif=oif_core,
         )
 
 
@@ -250,21 +269,30 @@ def set_routes_down(
         and default_tenant.mode == enums.ServiceMode.HUB
     ):
         return
+    # The network instance type doesn't change per route.
+    is_downlink = net_inst.type == enums.NetworkInstanceType.DOWNLINK
+    is_endpoint = net_inst.type == enums.NetworkInstanceType.ENDPOINT
     nat64_scope = configuration.get_network_instance_nat64_scope(net_inst)
     # This is the lazy, but for now efficient way to make sure that the routes
     # are correct.
     if active_connection and connection != active_connection:
         delete_all_routes(ni_dl, ni_core, net_inst, active_connection)
+    # Routes that are already correct are left alone, e.g. after an SA rekey.
+    routes_dl = route.dump(ni_dl)
+    routes_core = route.dump(ni_core)
     for route6 in connection.routes.ipv6:
         # routes in current the namespace
-        route.command(ni_dl, "replace", dst=route6.to, type="blackhole")
+        route.command(
+            ni_dl,
+            "replace",
+            dst=route6.to,
+            type="blackhole",
+            current=routes_dl,
+        )
         # routes in CORE for downlink
-        if net_inst.type in (
-            enums.NetworkInstanceType.DOWNLINK,
-            enums.NetworkInstanceType.ENDPOINT,
-        ):
+        if is_downlink or is_endpoint:
             adv6_route_down = route6.to
-            if net_inst.type == enums.NetworkInstanceType.DOWNLINK and route6.nptv6:
+            if is_downlink and route6.nptv6:
                 adv6_route_down = route6.nptv6_prefix
             # This will happen the first time a route is added and NPTv6 has't been
             # calculated yet
@@ -275,6 +303,7 @@ def set_routes_down(
                 "replace",
                 dst=adv6_route_down,
                 type="blackhole",
+                current=routes_core,
             )
 
     for route4 in connection.routes.ipv4:
@@ -284,22 +313,25 @@ def set_routes_down(
             "replace",
             dst=route4.to,
             type="blackhole",
+            current=routes_dl,
         )
         # routes in CORE for downlink
-        if net_inst.type == enums.NetworkInstanceType.ENDPOINT:
+        if is_endpoint:
             route.command(
                 ni_core,
                 "replace",
                 dst=route4.to,
                 type="blackhole",
+                current=routes_core,
             )
     # IPv4
-    if nat64_scope and net_inst.type == enums.NetworkInstanceType.DOWNLINK:
+    if nat64_scope and is_downlink:
         route.command(
             ni_core,
             "replace",
             dst=nat64_scope,
             type="blackhole",
+            current=routes_core,
         )
 
 
@@ -314,9 +346,12 @@ def delete_all_routes(
     This function is called when a connection is removed.
     """
     interface_name_downlink = connection.intf_name(net_inst)
-    nat64_scope = None
-    if net_inst:
-        nat64_scope = configuration.get_network_instance_nat64_scope(net_inst)
+    # Look up the interface once instead of for every route.
+    oif_downlink = next(iter(ni_dl.link_lookup(ifname=interface_name_downlink)), None)
+    # The network instance type doesn't change per route.
+    is_downlink = net_inst.type == enums.NetworkInstanceType.DOWNLINK
+    is_endpoint = net_inst.type == enums.NetworkInstanceType.ENDPOINT
+    nat64_scope = configuration.get_network_instance_nat64_scope(net_inst)
     for route6 in connection.routes.ipv6:
         # routes in current the namespace
         route.command(
@@ -325,19 +360,13 @@ def delete_all_routes(
             dst=route6.to,
             ifname=interface_name_downlink,
             gateway=route6.via,
+            oif=oif_downlink,
         )
 
         # routes in CORE for downlink
-        if net_inst.type in (
-            enums.NetworkInstanceType.DOWNLINK,
-            enums.NetworkInstanceType.ENDPOINT,
-        ):
+        if is_downlink or is_endpoint:
             adv6_route_del: IPv6Network = route6.to
-            if (
-                net_inst.type == enums.NetworkInstanceType.DOWNLINK
-                and route6.nptv6
-                and route6.nptv6_prefix
-            ):
+            if is_downlink and route6.nptv6 and route6.nptv6_prefix:
                 adv6_route_del = route6.nptv6_prefix
             route.command(
                 ni_core,
@@ -353,16 +382,17 @@ def delete_all_routes(
             dst=route4.to,
             ifname=interface_name_downlink,
             gateway=route4.via,
+            oif=oif_downlink,
         )
         # routes in CORE for downlink
-        if net_inst.type == enums.NetworkInstanceType.ENDPOINT:
+        if is_endpoint:
             route.command(
                 ni_core,
                 "del",
                 dst=route4.to,
             )
             # routes in CORE for downlink
-    if nat64_scope and net_inst.type == enums.NetworkInstanceType.DOWNLINK:
+    if nat64_scope and is_downlink:
         route.command(
             ni_core,
             "del",
@@ -7,11 +7,10 @@ import logging
 import os
 import pathlib
 import signal
+import string
 import subprocess
 from typing import TYPE_CHECKING
 
-import pyroute2
-
 import vpnc.models.connections
 import vpnc.models.ssh
 from vpnc.models import enums
@@ -28,6 +27,30 @@ SSH_SOCKET_DIR.mkdir(mode=770, parents=True, exist_ok=True)
 
 SSH_CONNECTIONS: dict[str, vpnc.models.connections.Connection] = {}
 
+# Configures the remote end of the tunnel. The templates are parsed once instead of
+# formatting the whole script for every connection.
+REMOTE_CONFIG_TEMPLATE = string.Template(
+    r"""set -e;
+sysctl -w net.ipv4.conf.all.forwarding=1;
+sysctl -w net.ipv6.conf.all.forwarding=1;
+sleep 2;
+printf '%s\n' 'link set dev ${remote_tun} up'${routes} | ip -batch -;
+iptables -C INPUT -i ${remote_tun} -j ACCEPT &> /dev/null || iptables -A INPUT -i ${remote_tun} -j ACCEPT;
+ip6tables -C INPUT -i ${remote_tun} -j ACCEPT &> /dev/null || ip6tables -A INPUT -i ${remote_tun} -j ACCEPT;
+iptables -C OUTPUT -o ${remote_tun} -m conntrack --ctstate RELATED,ESTABLISHED -j ACCEPT &> /dev/null || iptables -A OUTPUT -o ${remote_tun} -m conntrack --ctstate RELATED,ESTABLISHED -j ACCEPT;
+ip6tables -C OUTPUT -o ${remote_tun} -m conntrack --ctstate RELATED,ESTABLISHED -j ACCEPT &> /dev/null || ip6tables -A OUTPUT -o ${remote_tun} -m conntrack --ctstate RELATED,ESTABLISHED -j ACCEPT""",
+)
+# Appended when the remote end forwards and masquerades traffic to an interface.
+REMOTE_CONFIG_FORWARD_TEMPLATE = string.Template(
+    r""";
+iptables -C FORWARD -i ${remote_tun} -j ACCEPT &> /dev/null || iptables -A FORWARD -i ${remote_tun} -j ACCEPT;
+ip6tables -C FORWARD -i ${remote_tun} -j ACCEPT &> /dev/null || ip6tables -A FORWARD -i ${remote_tun} -j ACCEPT;
+iptables -C FORWARD -o ${remote_tun} -m conntrack --ctstate RELATED,ESTABLISHED -j ACCEPT &> /dev/null || iptables -A FORWARD -o ${remote_tun} -m conntrack --ctstate RELATED,ESTABLISHED -j ACCEPT;
+ip6tables -C FORWARD -o ${remote_tun} -m conntrack --ctstate RELATED,ESTABLISHED -j ACCEPT &> /dev/null || ip6tables -A FORWARD -o ${remote_tun} -m conntrack --ctstate RELATED,ESTABLISHED -j ACCEPT;
+iptables -C -t nat POSTROUTING -o ${remote_interface} -j MASQUERADE &> /dev/null || iptables -t nat -A POSTROUTING -o ${remote_interface} -j MASQUERADE;
+ip6tables -C -t nat POSTROUTING -o ${remote_interface} -j MASQUERADE &> /dev/null || ip6tables -t nat -A POSTROUTING -o ${remote_interface} -j MASQUERADE""",
+)
+
 
 def start(
     network_instance: vpnc.models.network_instance.NetworkInstance,
@@ -74,64 +97,65 @@ def start(
             network_instance,
         )
         remote_tun = f"tun{connection.config.remote_tunnel_id}"
-        routes: str = ""
-        for i in if_ipv4:
-            routes += rf"ip -4 route replace {i.network} dev {remote_tun};"
-
-        for j in if_ipv6:
-            routes += rf"ip -6 route replace {j.network} dev {remote_tun};"
+        # The interface and routes are configured by a single 'ip -batch' process.
+        # The address family follows from the prefix.
+        routes = "".join(
+            f" 'route replace {i.network} dev {remote_tun}'"
+            for i in (*if_ipv4, *if_ipv6)
+        )
 
-        remote_config = rf"""'set -e;
-sysctl -w net.ipv4.conf.all.forwarding=1;
-sysctl -w net.ipv6.conf.all.forwarding=1;
-sleep 2;
-ip link set dev {remote_tun} up;{routes}
-iptables -C INPUT -i {remote_tun} -j ACCEPT &> /dev/null || iptables -A INPUT -i {remote_tun} -j ACCEPT;
-ip6tables -C INPUT -i {remote_tun} -j ACCEPT &> /dev/null || ip6tables -A INPUT -i {remote_tun} -j ACCEPT;
-iptables -C OUTPUT -o {remote_tun} -m conntrack --ctstate RELATED,ESTABLISHED -j ACCEPT &> /dev/null || iptables -A OUTPUT -o {remote_tun} -m conntrack --ctstate RELATED,ESTABLISHED -j ACCEPT;
-ip6tables -C OUTPUT -o {remote_tun} -m conntrack --ctstate RELATED,ESTABLISHED -j ACCEPT &> /dev/null || ip6tables -A OUTPUT -o {remote_tun} -m conntrack --ctstate RELATED,ESTABLISHED -j ACCEPT'"""
+        remote_config = REMOTE_CONFIG_TEMPLATE.substitute(
+            remote_tun=remote_tun,
+            routes=routes,
+        )
         if connection.config.remote_config_interface is not None:
-            remote_config = rf"""'set -e;
-sysctl -w net.ipv4.conf.all.forwarding=1;
-sysctl -w net.ipv6.conf.all.forwarding=1;
-sleep 2;
-ip link set dev {remote_tun} up;{routes}
-iptables -C INPUT -i {remote_tun} -j ACCEPT &> /dev/null || iptables -A INPUT -i {remote_tun} -j ACCEPT;
-ip6tables -C INPUT -i {remote_tun} -j ACCEPT &> /dev/null || ip6tables -A INPUT -i {remote_tun} -j ACCEPT;
-iptables -C OUTPUT -o {remote_tun} -m conntrack --ctstate RELATED,ESTABLISHED -j ACCEPT &> /dev/null || iptables -A OUTPUT -o {remote_tun} -m conntrack --ctstate RELATED,ESTABLISHED -j ACCEPT;
-ip6tables -C OUTPUT -o {remote_tun} -m conntrack --ctstate RELATED,ESTABLISHED -j ACCEPT &> /dev/null || ip6tables -A OUTPUT -o {remote_tun} -m conntrack --ctstate RELATED,ESTABLISHED -j ACCEPT;
-iptables -C FORWARD -i {remote_tun} -j ACCEPT &> /dev/null || iptables -A FORWARD -i {remote_tun} -j ACCEPT;
-ip6tables -C FORWARD -i {remote_tun} -j ACCEPT &> /dev/null || ip6tables -A FORWARD -i {remote_tun} -j ACCEPT;
-iptables -C FORWARD -o {remote_tun} -m conntrack --ctstate RELATED,ESTABLISHED -j ACCEPT &> /dev/null || iptables -A FORWARD -o {remote_tun} -m conntrack --ctstate RELATED,ESTABLISHED -j ACCEPT;
-ip6tables -C FORWARD -o {remote_tun} -m conntrack --ctstate RELATED,ESTABLISHED -j ACCEPT &> /dev/null || ip6tables -A FORWARD -o {remote_tun} -m conntrack --ctstate RELATED,ESTABLISHED -j ACCEPT;
-iptables -C -t nat POSTROUTING -o {connection.config.remote_config_interface} -j MASQUERADE &> /dev/null || iptables -t nat -A POSTROUTING -o {connection.config.remote_config_interface} -j MASQUERADE;
-ip6tables -C -t nat POSTROUTING -o {connection.config.remote_config_interface} -j MASQUERADE &> /dev/null || ip6tables -t nat -A POSTROUTING -o {connection.config.remote_config_interface} -j MASQUERADE'"""
-
-    master_local_tunnel = rf"""
-/usr/sbin/ip netns exec {network_instance.id} \
-autossh -f -M 0 \
--o ControlMaster=yes \
--o ControlPath={ssh_master_socket} \
--o Tunnel=point-to-point \
--o ExitOnForwardFailure=yes \
--o ConnectTimeout=10 \
--o ServerAliveInterval=5 \
--o ServerAliveCountMax=5 \
--o StrictHostKeyChecking=accept-new \
--w {connection.id}:{connection.config.remote_tunnel_id} \
-{connection.config.username}@{connection.config.remote_addrs[0]} {remote_config}
-"""
-
-    master_tunnel_proc = subprocess.run(  # noqa: S602
+            remote_config += REMOTE_CONFIG_FORWARD_TEMPLATE.substitute(
+                remote_tun=remote_tun,
+                remote_interface=connection.config.remote_config_interface,
+            )
+
+    master_local_tunnel = [
+        "/usr/sbin/ip",
+        "netns",
+        "exec",
+        network_instance.id,
+        "autossh",
+        "-f",
+        "-M",
+        "0",
+        "-o",
+        "ControlMaster=yes",
+        "-o",
+        f"ControlPath={ssh_master_socket}",
+        "-o",
+        "Tunnel=point-to-point",
+        "-o",
+        "ExitOnForwardFailure=yes",
+        "-o",
+        "ConnectTimeout=10",
+        "-o",
+        "ServerAliveInterval=5",
+        "-o",
+        "ServerAliveCountMax=5",
+        "-o",
+        "StrictHostKeyChecking=accept-new",
+        "-w",
+        f"{connection.id}:{connection.config.remote_tunnel_id}",
+        f"{connection.config.username}@{connection.config.remote_addrs[0]}",
+    ]
+    if remote_config:
+        master_local_tunnel.append(remote_config)
+
+    master_tunnel_proc = subprocess.run(  # noqa: S603
         master_local_tunnel,
         capture_output=True,
         text=True,
-        shell=True,
         check=True,
         env=autossh_master_env,
     )
-    logger.info(master_tunnel_proc.args)
-    logger.info("%s\n%s", master_tunnel_proc.stdout, master_tunnel_proc.stderr)
+    # The arguments include the whole remote configuration script.
+    logger.debug(master_tunnel_proc.args)
+    logger.debug("%s\n%s", master_tunnel_proc.stdout, master_tunnel_proc.stderr)
 
     SSH_CONNECTIONS[connection_name] = connection
     atexit.register(stop, network_instance, connection)
@@ -153,9 +177,12 @@ def stop(
         ssh_master_pid = int(ssh_master_pid_file.read_text())
 
     if ssh_master_pid:
-        proc = pyroute2.NSPopen(
-            network_instance.id,
+        subprocess.run(  # noqa: S603
             [
+                "/usr/sbin/ip",
+                "netns",
+                "exec",
+                network_instance.id,
                 "ssh",
                 "-o",
                 f"ControlPath={ssh_master_socket}",
@@ -163,9 +190,8 @@ def stop(
                 "exit",
                 f"{connection.config.username}:{connection.config.remote_addrs[0]}",
             ],
+            check=False,
         )
-        proc.wait()
-        proc.release()
         process_path = pathlib.Path(f"/proc/{ssh_master_pid}/comm")
         if not process_path.exists():
             return
@@ -3,7 +3,11 @@
 from __future__ import annotations
 
 import asyncio
+import concurrent.futures
+import contextlib
+import functools
 import logging
+import random
 import threading
 import time
 from types import MappingProxyType
@@ -24,13 +28,48 @@ IkeData: TypeAlias = MappingProxyType[str, bytes | IkeProperties]
 EventType: TypeAlias = bytes
 Event: TypeAlias = tuple[EventType, IkeData]
 
+# VICI sessions used to send commands. A session isn't thread safe, so each thread
+# gets its own, which is reused for all commands sent from that thread.
+VICI_SESSIONS = threading.local()
+
+
+def parse_ike_name(ike_event: IkeData) -> str:
+    """Return the name of the IKE SA an event is about.
+
+    The 'ike-updown' event has an 'up' key before the IKE SA name when the SA is up.
+    """
+    keys = iter(ike_event)
+    first = next(keys)
+    return next(keys, first)
+
+
+def get_older_sa_ids(sas: list[tuple[int, bytes]]) -> list[bytes]:
+    """Return the identifiers of all SAs except the most recently established one.
+
+    Takes a list of (seconds since established, unique identifier) tuples. If SAs
+    were established at the same time, the last one in the list is kept.
+    """
+    if len(sas) <= 1:
+        return []
+    youngest = min(range(len(sas)), key=lambda idx: (sas[idx][0], -idx))
+    return [unique_id for idx, (_, unique_id) in enumerate(sas) if idx != youngest]
+
 
 class Monitor(threading.Thread):
     """Monitor the strongswan service and components.
 
-    This is blocking and as such, runs in separate threads.
+    This is blocking and as such, runs in a separate thread with its own event loop.
     """
 
+    def __init__(self, *args: Any, **kwargs: Any) -> None:  # noqa: ANN401
+        """Initialize the thread and the SA cache."""
+        super().__init__(*args, **kwargs)
+        # SAs per list_sas filter, valid while handling a single burst of SA events.
+        self.sa_cache: dict[str, list[IkeData]] = {}
+        # Netlink sockets per network instance, also only kept for a single burst of
+        # SA events. A network instance may be removed and recreated in between.
+        self.netns_cache: dict[str, pyroute2.NetNS] = {}
+
     def run(self) -> None:
         """Override and entrypoint of the threading.Thread class."""
         while not shared.STOP_EVENT.is_set():
@@ -40,36 +79,68 @@ class Monitor(threading.Thread):
             # TODO @draggeta: make sure this doesn't infinitely retry
             except Exception:  # noqa: BLE001, PERF203
                 logger.warning("VPNC strongswan monitor crashed", exc_info=True)
+                self.reset_session()
                 time.sleep(1)
         logger.info("Exiting VPNC Strongswan monitor")
 
     async def monitor(self) -> None:
-        """Test function."""
+        """Run the monitors as tasks on the event loop of the thread."""
         # Get the current event loop for the thread.
         loop = asyncio.get_running_loop()
+        # VICI commands for SA events are sent from a single worker thread. This
+        # keeps them in order and lets them share one VICI session.
+        self.executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=1,
+            thread_name_prefix="vpnc-vici",
+        )
+        events: asyncio.Queue[Event] = asyncio.Queue()
 
-        # Run the task to monitor the security associations for duplicates.
-        logger.info("Starting duplicate SA monitor.")
-        duplicates = threading.Thread(
-            target=self.monitor_duplicate_sa_events,
-            daemon=True,
+        # Run the task that listens for SA events.
+        logger.info("Starting SA event listener.")
+        listener = loop.create_task(
+            self.supervise("SA event listener", self.listen_sa_events, events),
         )
-        duplicates.start()
 
-        # Run the task to monitor the XFRM interface state.
-        logger.info("Starting interface state monitor.")
-        interface_state = threading.Thread(
-            target=self.monitor_xfrm_interface_state,
-            daemon=True,
+        # Run the task to monitor the security associations for duplicates and to
+        # set the XFRM interface state.
+        logger.info("Starting duplicate SA and interface state monitor.")
+        sa_events = loop.create_task(
+            self.supervise("SA event monitor", self.monitor_sa_events, events),
         )
-        interface_state.start()
 
         # Run the task to check for inactive and active connections every interval.
         logger.info("Starting inactive/active connection monitor.")
         inactives = loop.create_task(
-            self.repeat(30, self.monitor_connections, init_wait=False),
+            self.supervise(
+                "inactive/active connection monitor",
+                self.repeat,
+                30,
+                self.monitor_connections,
+                init_wait=False,
+            ),
         )
-        await inactives
+        try:
+            await asyncio.gather(listener, sa_events, inactives)
+        finally:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+
+    async def supervise(
+        self,
+        name: str,
+        func: Callable[..., Awaitable[None]],
+        *args: Any,  # noqa: ANN401
+        **kwargs: Any,  # noqa: ANN401
+    ) -> None:
+        """Run func until the service stops, restarting it when it crashes.
+
+        This keeps a failing monitor from taking down the other monitors.
+        """
+        while not shared.STOP_EVENT.is_set():
+            try:
+                await func(*args, **kwargs)
+            except Exception:
+                logger.warning("VPNC Strongswan %s crashed", name, exc_info=True)
+                await asyncio.sleep(1)
 
     async def repeat(
         self,
@@ -81,18 +152,19 @@ class Monitor(threading.Thread):
     ) -> None:
         """Run func every interval seconds.
 
-        If func has not finished before *interval*, will run again
+        The next run is only scheduled after func has finished, so runs never
+        overlap. If func has not finished before *interval*, will run again
         immediately when the previous iteration finished.
 
         *args and **kwargs are passed as the arguments to func.
         """
+        loop = asyncio.get_running_loop()
         if init_wait:
             await asyncio.sleep(interval)
         while not shared.STOP_EVENT.is_set():
-            await asyncio.gather(
-                func(*args, **kwargs),
-                asyncio.sleep(interval),
-            )
+            start = loop.time()
+            await func(*args, **kwargs)
+            await asyncio.sleep(max(0, interval - (loop.time() - start)))
 
     async def monitor_connections(self) -> None:
         """Monitor for inactive connections.
@@ -102,21 +174,39 @@ class Monitor(threading.Thread):
         This doesn't check for IKE SAs without IPsec SAs.
         Also checks for SAs that aren't configured and removes these
         """
-        vcs = self.connect()
-        conns: list[str] = [x.decode() for x in vcs.get_conns()["conns"]]
-        sas: list[str] = [next(iter(i.keys())) for i in vcs.list_sas()]
+        loop = asyncio.get_running_loop()
+        try:
+            vcs = self.session()
+            conns: list[str] = [x.decode() for x in vcs.get_conns()["conns"]]
+            sas: list[str] = [next(iter(i.keys())) for i in vcs.list_sas()]
+        except (OSError, vici.exception.SessionException):
+            logger.warning("VICI session failed. Reconnecting.", exc_info=True)
+            self.reset_session()
+            return
         logger.debug("Configured connections: %s", conns)
         logger.debug("Active connections: %s", sas)
 
         # TODO@draggeta: Implement IKE SA without IPsec SAs check?
 
+        # Initiating and terminating SAs blocks until Strongswan is done. The
+        # commands are run concurrently, but limited to not overload Strongswan.
+        semaphore = asyncio.Semaphore(8)
+
+        async def run(func: Callable[..., None], **kwargs: Any) -> None:  # noqa: ANN401
+            async with semaphore:
+                await loop.run_in_executor(
+                    None,
+                    functools.partial(self.run_vici_command, func, **kwargs),
+                )
+
+        commands: list[Awaitable[None]] = []
         # For each configured connection, check if there is a SA. If not, start
         # the connection.
         for con in conns:
             if con in sas:
                 continue
             logger.info("Initiating connection '%s'", con)
-            self.initiate_sa(vcs=vcs, ike=con, child=con)
+            commands.append(run(self.initiate_sa, ike=con, child=con))
 
         # For each SA, check if there is a configured connection. If not, delete
         # the connection.
@@ -124,54 +214,126 @@ class Monitor(threading.Thread):
             if sa in conns:
                 continue
             logger.info("Terminating connection '%s'", sa)
-            self.terminate_sa(vcs=vcs, ike=sa)
+            commands.append(run(self.terminate_sa, ike=sa))
 
-    def monitor_duplicate_sa_events(self) -> None:
-        """Monitor for SA events.
+        await asyncio.gather(*commands)
 
-        check if there are duplicates and take action accordingly.
-        """
-        vcs = self.connect()
-        for event in vcs.listen(
+    async def listen_sa_events(self, events: asyncio.Queue[Event]) -> None:
+        """Listen for SA events and put them on the event queue."""
+        loop = asyncio.get_running_loop()
+        vcs = await loop.run_in_executor(None, self.connect)
+        listener = vcs.listen(
             event_types=["ike-updown", "child-updown"],
             timeout=0.1,
-        ):
-            if shared.STOP_EVENT.is_set():
-                return
-            if event == (None, None):
-                continue
-            event_type, event_data = event
-            if event_type is None or event_data is None:
-                continue
-            match event_type:
-                # check for duplicate IKE associations
-                case b"ike-updown":
-                    self.resolve_duplicate_ike_sa(event_data)
-                # check for duplicate IPSec associations
-                case b"child-updown":
-                    self.resolve_duplicate_ipsec_sa(event_data)
-
-    def monitor_xfrm_interface_state(self) -> None:
-        """Monitor VPN tunnel state and set interface state accordingly."""
-        vcs = self.connect()
+        )
+        try:
+            while not shared.STOP_EVENT.is_set():
+                # Waiting for an event blocks, so it is done outside the event loop.
+                event = await loop.run_in_executor(None, next, listener, None)
+                if event is None:
+                    msg = "VICI event listener stopped unexpectedly."
+                    raise ConnectionError(msg)
+                event_type, event_data = event
+                if event_type is None or event_data is None:
+                    continue
+                await events.put((event_type, event_data))
+        finally:
+            # The listener is restarted with a new session when it fails. The socket
+            # may already be closed by the daemon.
+            with contextlib.suppress(OSError):
+                vcs.transport.close()
+
+    async def monitor_sa_events(self, events: asyncio.Queue[Event]) -> None:
+        """Monitor for SA events.
+
+        Check if there are duplicates and take action accordingly and set the
+        interface state of the VPN tunnel.
+        """
+        loop = asyncio.get_running_loop()
 
         # At startup check for interface states
-        for i in vcs.list_sas():
-            self.resolve_xfrm_interface_state(i)
+        await loop.run_in_executor(self.executor, self.resolve_all_sa_states)
 
         # Then check the queue for new events
-        for event in vcs.listen(
-            event_types=["ike-updown", "child-updown"],
-            timeout=0.1,
-        ):
-            if shared.STOP_EVENT.is_set():
-                return
-            if event == (None, None):
-                continue
-            event_type, event_data = event
-            if event_type is None or event_data is None:
+        while not shared.STOP_EVENT.is_set():
+            try:
+                event_type, event_data = await asyncio.wait_for(events.get(), 1)
+            # Python 3.10 doesn't raise the builtin TimeoutError.
+            except asyncio.TimeoutError:  # noqa: UP041
                 continue
-            self.resolve_xfrm_interface_state(event_data)
+
+            # Events arrive in bursts, for example when SAs rekey. Collect the events
+            # that follow in quick succession so each SA is only handled once.
+            sa_events: dict[tuple[EventType, str], IkeData] = {
+                (event_type, parse_ike_name(event_data)): event_data,
+            }
+            deadline = loop.time() + 1
+            while loop.time() < deadline:
+                try:
+                    event_type, event_data = await asyncio.wait_for(events.get(), 0.1)
+                except asyncio.TimeoutError:  # noqa: UP041
+                    break
+                sa_events[(event_type, parse_ike_name(event_data))] = event_data
+
+            await loop.run_in_executor(
+                self.executor,
+                self.resolve_sa_events,
+                sa_events,
+            )
+
+    def resolve_all_sa_states(self) -> None:
+        """Set the interface state for all VPN tunnels."""
+        try:
+            for sa in self.session().list_sas():
+                self.resolve_xfrm_interface_state(sa)
+        except (OSError, vici.exception.SessionException):
+            # The SA event monitor is restarted and resolves all states again with a
+            # new session.
+            self.reset_session()
+            raise
+        finally:
+            self.close_netns()
+
+    def resolve_sa_events(
+        self,
+        sa_events: dict[tuple[EventType, str], IkeData],
+    ) -> None:
+        """Resolve duplicate SAs and the interface state for SA events."""
+        # The SAs may have changed since the previous burst of events.
+        self.sa_cache.clear()
+        try:
+            for (event_type, _), event_data in sa_events.items():
+                match event_type:
+                    # check for duplicate IKE associations
+                    case b"ike-updown":
+                        self.resolve_duplicate_ike_sa(event_data)
+                    # check for duplicate IPSec associations
+                    case b"child-updown":
+                        self.resolve_duplicate_ipsec_sa(event_data)
+
+            # The interface state only depends on the current state of the SA, so
+            # it is resolved once per SA.
+            ike_events = {ike_name: data for (_, ike_name), data in sa_events.items()}
+            for event_data in ike_events.values():
+                self.resolve_xfrm_interface_state(event_data)
+        except (OSError, vici.exception.SessionException):
+            logger.warning("VICI session failed. Reconnecting.", exc_info=True)
+            self.reset_session()
+        finally:
+            self.close_netns()
+
+    def netns(self, network_instance_name: str) -> pyroute2.NetNS:
+        """Return the netlink socket of a network instance, opening it if needed."""
+        if (netns := self.netns_cache.get(network_instance_name)) is None:
+            netns = pyroute2.NetNS(network_instance_name)
+            self.netns_cache[network_instance_name] = netns
+        return netns
+
+    def close_netns(self) -> None:
+        """Close the netlink sockets opened while handling SA events."""
+        for netns in self.netns_cache.values():
+            netns.close()
+        self.netns_cache.clear()
 
     def resolve_xfrm_interface_state(self, ike_event: IkeData) -> None:
         """Resolve route advertisement statuses.
@@ -181,11 +343,7 @@ class Monitor(threading.Thread):
         Tries to resolve the current routes as in the FDB and what should be advertised.
         If the connection is down, the advertisements should be retracted.
         """
-        ike_name: str
-        if len(keys := ike_event.keys()) == 2:  # noqa: PLR2004
-            _, ike_name = list(keys)
-        else:
-            ike_name = next(iter(keys))
+        ike_name = parse_ike_name(ike_event)
 
         if ike_name.startswith(config.CORE_NI):
             tenant_id = "DEFAULT"
@@ -205,59 +363,52 @@ class Monitor(threading.Thread):
                 logger.info("No configuration file found for '%s'", tenant_id)
                 return
 
-        vcs = self.connect()
+        vcs = self.session()
 
-        # Get VPN state
-        vpn: dict[str, Any] = {}
-        if v := list(vcs.list_sas({"ike": ike_name, "child": ike_name})):
-            vpn = v[0]
-        ike_data: dict[str, Any] = vpn.get(ike_name, {})
-        list_child_sas: list[str]
-        if list_child_sas := list(ike_data.get("child-sas", {}).keys()):
-            child_id: str = list_child_sas[0]
-        else:
-            child_id = ""
-        child_data = ike_data.get("child-sas", {}).get(child_id, {})
-
-        with pyroute2.NetNS(network_instance_name) as netns:
-            ifname = f"xfrm{connection_id}"
-            if not (iflookup := netns.link_lookup(ifname=ifname)):
-                logger.warning(
-                    "Network instance %s interface %s doesn't exist.",
-                    network_instance_name,
-                    ifname,
-                )
-                return
-            ifidx = iflookup[0]
-            if (
-                ike_data.get("state", b"") == b"ESTABLISHED"
+        # The interface is up if any SA is established with the CHILD SA installed.
+        # This uses the same SA listing as the duplicate checks, and stops at the
+        # first match.
+        action = "down"
+        for ike_sa in self.list_sas(vcs, {"ike": ike_name}):
+            ike_data: dict[str, Any] = ike_sa.get(ike_name, {})
+            if ike_data.get("state", b"") != b"ESTABLISHED":
+                continue
+            if any(
+                child_data.get("name", b"") == ike_name.encode()
                 and child_data.get("state", b"") == b"INSTALLED"
+                for child_data in ike_data.get("child-sas", {}).values()
             ):
                 action = "up"
-            else:
-                action = "down"
+                break
 
-            logger.info(
-                "Bringing interface 'xfrm%s' %s.",
-                connection_id,
-                action,
+        netns = self.netns(network_instance_name)
+        ifname = f"xfrm{connection_id}"
+        if not (iflookup := netns.link_lookup(ifname=ifname)):
+            logger.warning(
+                "Network instance %s interface %s doesn't exist.",
+                network_instance_name,
+                ifname,
             )
-            netns.link("set", index=ifidx, state=action)
+            return
+        ifidx = iflookup[0]
+        logger.info(
+            "Bringing interface 'xfrm%s' %s.",
+            connection_id,
+            action,
+        )
+        netns.link("set", index=ifidx, state=action)
 
     def resolve_duplicate_ike_sa(self, ike_event: IkeData) -> None:
         """Check for duplicate IPsec security associations.
 
         If SAs need be removed, the older ones are removed in favor of the youngest.
         """
-        vcs: vici.Session = self.connect()
-        if len(keys := ike_event.keys()) == 2:  # noqa: PLR2004
-            ike_name = list(keys)[1]
-        else:
-            ike_name = next(iter(keys))
+        vcs: vici.Session = self.session()
+        ike_name = parse_ike_name(ike_event)
 
         logger.debug("IKE event received for SA '%s'", ike_name)
 
-        ike_sas: list[IkeData] = list(vcs.list_sas({"ike": ike_name}))
+        ike_sas: list[IkeData] = self.list_sas(vcs, {"ike": ike_name})
 
         if len(ike_sas) <= 1:
             logger.debug(
@@ -266,96 +417,115 @@ class Monitor(threading.Thread):
             )
             return
 
-        best_ike_sa_event: IkeData = {}
-
-        for idx, ike_sa_event in enumerate(ike_sas):
-            for ike_name, ike_sa in ike_sa_event.items():
-                # First item has nothing to compare to.
-                if idx == 0:
-                    best_ike_sa_event = ike_sa_event
-                    continue
-
-                # Compare the seconds since the SA was established. Choose the most
-                # recent one.
+        # Collect the seconds since each SA was established. SAs without this
+        # information are left alone until a later event.
+        established_sas: list[tuple[int, bytes]] = []
+        for ike_sa_event in ike_sas:
+            for ike_sa in ike_sa_event.values():
                 try:
-                    ike_sa_established = int(ike_sa["established"])
-                    best_sa_established = int(
-                        best_ike_sa_event[ike_name]["established"],
+                    established_sas.append(
+                        (int(ike_sa["established"]), ike_sa["uniqueid"]),
                     )
-                except TypeError:
-                    continue
-                except KeyError:
+                except (TypeError, KeyError):
                     continue
 
-                if ike_sa_established <= best_sa_established:
-                    self.terminate_sa(
-                        vcs=vcs,
-                        ike_id=best_ike_sa_event[ike_name]["uniqueid"],
-                    )
-                    best_ike_sa_event = ike_sa_event
-                else:
-                    self.terminate_sa(vcs=vcs, ike_id=ike_sa["uniqueid"])
+        for ike_id in get_older_sa_ids(established_sas):
+            self.terminate_sa(vcs=vcs, ike_id=ike_id)
 
     def resolve_duplicate_ipsec_sa(self, ike_event: IkeData) -> None:
         """Check for duplicate IPsec security associations.
 
         If SAs need be removed, the older ones are removed in favor of the youngest.
         """
-        vcs = self.connect()
-        if len(keys := ike_event.keys()) == 2:  # noqa: PLR2004
-            _, ike_name = list(keys)
-        else:
-            ike_name = next(iter(keys))
-        ike_sas: list[IkeData] = list(vcs.list_sas({"ike": ike_name}))
+        vcs = self.session()
+        ike_name = parse_ike_name(ike_event)
+        ike_sas: list[IkeData] = self.list_sas(vcs, {"ike": ike_name})
 
         for ike_sa in ike_sas:
             ike_sa_props = ike_sa[ike_name]
 
-            # Get the most recent SA for each TS pair.
-            ts_unique: dict[str, Any] = {}
-
+            # The check must be done per traffic selector pair. Collect the seconds
+            # since each SA was installed per pair. SAs without this information are
+            # left alone until a later event.
+            ts_installed_sas: dict[str, list[tuple[int, bytes]]] = {}
             for ipsec_sa in ike_sa_props["child-sas"].values():
-                # The check must be done per traffic selector pair.
-                # If this is the first time seeing the traffic selector for the IKE SA,
-                # don't do anything.
                 ts_key = str((ipsec_sa["local-ts"], ipsec_sa["remote-ts"]))
-                if ts_key not in ts_unique:
-                    ts_unique[ts_key] = ipsec_sa
-                    continue
-
-                # Compare the seconds since the SA was established. Choose the most
-                # recent one.
                 try:
-                    ipsec_sa_established = int(ipsec_sa["install-time"])
-                    best_sa_established = int(ts_unique[ts_key]["install-time"])
-                except TypeError:
-                    continue
-                except KeyError:
+                    installed_sa = (int(ipsec_sa["install-time"]), ipsec_sa["uniqueid"])
+                except (TypeError, KeyError):
                     continue
+                ts_installed_sas.setdefault(ts_key, []).append(installed_sa)
+
+            for installed_sas in ts_installed_sas.values():
+                for child_id in get_older_sa_ids(installed_sas):
+                    self.terminate_sa(vcs=vcs, child_id=child_id)
+
+    def session(self) -> vici.Session:
+        """Return the VICI session of the current thread, connecting if needed."""
+        vcs: vici.Session | None = getattr(VICI_SESSIONS, "vcs", None)
+        if vcs is None:
+            vcs = self.connect()
+            VICI_SESSIONS.vcs = vcs
+        return vcs
+
+    def reset_session(self) -> None:
+        """Drop the VICI session of the current thread so the next use reconnects."""
+        VICI_SESSIONS.vcs = None
 
-                if ipsec_sa_established <= best_sa_established:
-                    self.terminate_sa(vcs=vcs, child_id=ts_unique[ts_key]["uniqueid"])
-                    ts_unique[ts_key] = ipsec_sa
-                else:
-                    self.terminate_sa(vcs=vcs, child_id=ipsec_sa["uniqueid"])
+    def run_vici_command(
+        self,
+        func: Callable[..., None],
+        **kwargs: Any,  # noqa: ANN401
+    ) -> None:
+        """Run a VICI command with the session of the current thread."""
+        try:
+            func(vcs=self.session(), **kwargs)
+        except (OSError, vici.exception.SessionException):
+            logger.warning("VICI session failed. Reconnecting.", exc_info=True)
+            self.reset_session()
 
-    def connect(self, tries: int = 10, delay: int = 2) -> vici.Session:
-        """Try to connect to the VICI socket."""
+    def connect(
+        self,
+        tries: int = 10,
+        delay: float = 0.1,
+        max_delay: float = 5,
+    ) -> vici.Session:
+        """Try to connect to the VICI socket.
+
+        The delay between tries doubles up to max_delay. Jitter is added so the
+        threads that lost their session don't retry in lockstep.
+        """
         for i in range(tries):
             try:
                 return vici.Session()
             except (ConnectionRefusedError, FileNotFoundError) as err:  # noqa: PERF203
-                if i >= tries:
+                if i >= tries - 1:
                     logger.warning(
                         "VICI socket not available after %s tries. Exiting.",
                         tries,
                     )
                     raise ConnectionError from err
                 logger.info("VICI socket is not yet available. Retrying.")
-                time.sleep(delay)
+                time.sleep(min(max_delay, delay * 2**i) + random.uniform(0, delay))  # noqa: S311
 
         raise ConnectionAbortedError
 
+    def list_sas(
+        self,
+        vcs: vici.Session,
+        sa_filter: dict[str, str] | None = None,
+    ) -> list[IkeData]:
+        """Return the SAs matching the filter.
+
+        The result is cached until the next burst of SA events, as multiple events
+        for the same SA often arrive together.
+        """
+        cache_key = repr(sorted((sa_filter or {}).items()))
+        if (sas := self.sa_cache.get(cache_key)) is None:
+            sas = list(vcs.list_sas(sa_filter))
+            self.sa_cache[cache_key] = sas
+        return sas
+
     def initiate_sa(
         self,
         vcs: vici.Session,
@@ -374,6 +544,7 @@ class Monitor(threading.Thread):
             _filter.update({"child": child})
 
         logger.info("Initiating SA with parameters: '%s'", _filter)
+        self.sa_cache.clear()
         try:
             for i in vcs.initiate(_filter):
                 logger.debug(i)
@@ -408,6 +579,7 @@ class Monitor(threading.Thread):
             _filter.update({"child-id": child_id})
 
         logger.info("Terminating SA with parameters: '%s'", _filter)
+        self.sa_cache.clear()
         try:
             for i in vcs.terminate(_filter):
                 logger.debug(i)
@@ -6,18 +6,18 @@ import atexit
 import logging
 import os
 import pathlib
+import queue
 import subprocess
 import sys
+import threading
 import time
 from typing import TYPE_CHECKING, Any
 
 import pyroute2
 import vici
-from jinja2 import Environment, FileSystemLoader
 from watchdog.events import FileSystemEvent, PatternMatchingEventHandler
-from watchdog.observers import Observer
 
-from vpnc import config
+from vpnc import config, shared
 from vpnc.models import enums, tenant
 
 if TYPE_CHECKING:
@@ -29,51 +29,117 @@ logger = logging.getLogger("vpnc")
 
 BASE_DIR = pathlib.Path(__file__).parent
 TEMPLATES_DIR = BASE_DIR.joinpath("templates")
-TEMPLATES_ENV = Environment(loader=FileSystemLoader(TEMPLATES_DIR), autoescape=True)
+TEMPLATES_ENV = shared.get_templates_env(TEMPLATES_DIR)
+SWANCTL_TEMPLATE = TEMPLATES_ENV.get_template("swanctl.conf.j2")
 
 
-def observe() -> BaseObserver:
+def observe() -> BaseObserver:  # noqa: C901
     """Create the observer for swanctl configuration."""
 
     # Define what should happen when downlink files are created, modified or deleted.
     class SwanctlHandler(PatternMatchingEventHandler):
-        """Handler for the event monitoring."""
+        """Handler for the event monitoring.
+
+        Events are not handled directly. They are queued and a single worker reloads
+        the configuration once a burst of events has passed.
+        """
+
+        def __init__(self, *args: Any, **kwargs: Any) -> None:  # noqa: ANN401
+            super().__init__(*args, **kwargs)
+            self.events: queue.Queue[str] = queue.Queue()
+            self.loaded_state: set[tuple[str, int, int]] | None = None
+            worker = threading.Thread(target=self.reload_worker, daemon=True)
+            worker.start()
 
         def on_created(self, event: FileSystemEvent) -> None:
             logger.info("File %s: %s", event.event_type, event.src_path)
-            time.sleep(0.1)
-            self.reload_config()
+            self.events.put(event.src_path)
 
         def on_modified(self, event: FileSystemEvent) -> None:
             logger.info("File %s: %s", event.event_type, event.src_path)
-            time.sleep(0.1)
-            self.reload_config()
+            self.events.put(event.src_path)
+
+        def on_closed(self, event: FileSystemEvent) -> None:
+            logger.info("File %s: %s", event.event_type, event.src_path)
+            self.events.put(event.src_path)
+
+        def on_moved(self, event: FileSystemEvent) -> None:
+            logger.info(
+                "File %s: %s to %s",
+                event.event_type,
+                event.src_path,
+                event.dest_path,
+            )
+            self.events.put(event.dest_path)
 
         def on_deleted(self, event: FileSystemEvent) -> None:
             logger.info("File %s: %s", event.event_type, event.src_path)
-            time.sleep(0.1)
-            self.reload_config()
+            self.events.put(event.src_path)
+
+        def reload_worker(self) -> None:
+            """Reload the configuration once per burst of file events."""
+            while not shared.STOP_EVENT.is_set():
+                try:
+                    self.events.get(timeout=1)
+                except queue.Empty:
+                    continue
+                # Drain the events that arrive in quick succession, such as when
+                # multiple network instances are configured at once.
+                while True:
+                    try:
+                        self.events.get(timeout=0.25)
+                    except queue.Empty:
+                        break
+                self.reload_config()
 
         def reload_config(self) -> None:
             """Load all swanctl strongswan configurations."""
-            # with SW_LOCK:
+            # Skip the reload if the configuration files haven't changed since the
+            # last time they were loaded.
+            current_state: set[tuple[str, int, int]] = set()
+            with os.scandir(config.IPSEC_CONFIG_DIR) as entries:
+                for entry in entries:
+                    if not entry.name.endswith(".conf"):
+                        continue
+                    try:
+                        stat = entry.stat()
+                    except FileNotFoundError:
+                        continue
+                    current_state.add((entry.name, stat.st_mtime_ns, stat.st_size))
+            if current_state == self.loaded_state:
+                logger.debug("No swanctl configuration changes. Skipping reload.")
+                return
+
             logger.debug("Loading all swanctl connections.")
+            # The output is only logged at debug level, don't capture it otherwise.
+            debug = logger.isEnabledFor(logging.DEBUG)
             proc = subprocess.run(  # noqa: S603
                 ["/usr/sbin/swanctl", "--load-all", "--clear"],
-                stdout=subprocess.PIPE,
-                check=True,
+                stdout=subprocess.PIPE if debug else subprocess.DEVNULL,
+                text=True,
+                check=False,
             )
-            logger.debug(proc.stdout)
+            if debug:
+                logger.debug(proc.stdout)
+            if proc.returncode != 0:
+                logger.warning("Loading the swanctl connections failed.")
+                return
+            self.loaded_state = current_state
 
     # Create the observer object. This doesn't start the handler.
-    observer: BaseObserver = Observer()
+    observer = shared.create_observer(config.IPSEC_CONFIG_DIR)
 
     # Configure the event handler that watches directories.
     # This doesn't start the handler.
     observer.schedule(
-        event_handler=SwanctlHandler(patterns=["*.conf"], ignore_directories=True),
+        event_handler=SwanctlHandler(
+            patterns=["*.conf"],
+            ignore_patterns=[".*", "~*"],
+            ignore_directories=True,
+        ),
         path=config.IPSEC_CONFIG_DIR,
         recursive=False,
+        event_filter=shared.get_event_filter(observer),
     )
     # The handler should exit on main thread close
     observer.daemon = True
@@ -86,45 +152,42 @@ def generate_config(
 ) -> None:
     """Generate swanctl configurations."""
     default_tenant = tenant.get_default_tenant()
-    swanctl_template = TEMPLATES_ENV.get_template("swanctl.conf.j2")
     swanctl_cfgs: list[dict[str, Any]] = []
-    vpn_id = int("0x10000000", 16)
+    # Must match the XFRM interface IDs of the connections.
+    vpn_id = 0x10000000
     if network_instance.type == enums.NetworkInstanceType.DOWNLINK:
-        vpn_id = int(f"0x{network_instance.id.replace('-', '')}0", 16)
+        vpn_id = int(network_instance.id.replace("-", ""), 16) << 4
 
     for connection in network_instance.connections.values():
-        if connection.config.type != enums.ConnectionType.IPSEC:
+        connection_config = connection.config
+        if connection_config.type != enums.ConnectionType.IPSEC:
             continue
+        # Fall back to the remote address and tenant ID if the connection doesn't
+        # specify its own IDs.
+        remote_id = connection_config.remote_id
+        local_id = connection_config.local_id
         swanctl_cfg: dict[str, Any] = {
             "connection": f"{network_instance.id}-{connection.id}",
-            "local_id": default_tenant.local_id,
-            "remote_peer_ip": ",".join(
-                [str(x) for x in connection.config.remote_addrs],
+            "local_id": default_tenant.local_id if local_id is None else local_id,
+            "remote_peer_ip": ",".join(str(x) for x in connection_config.remote_addrs),
+            "remote_id": (
+                connection_config.remote_addrs[0] if remote_id is None else remote_id
             ),
-            "remote_id": connection.config.remote_addrs[0],
             "xfrm_id": hex(vpn_id + connection.id),
-            "ike_version": connection.config.ike_version,
-            "ike_proposal": connection.config.ike_proposal,
-            "ike_lifetime": connection.config.ike_lifetime,
-            "ipsec_proposal": connection.config.ipsec_proposal,
-            "ipsec_lifetime": connection.config.ipsec_lifetime,
-            "initiation": connection.config.initiation.value,
-            "psk": connection.config.psk,
+            "ike_version": connection_config.ike_version,
+            "ike_proposal": connection_config.ike_proposal,
+            "ike_lifetime": connection_config.ike_lifetime,
+            "ipsec_proposal": connection_config.ipsec_proposal,
+            "ipsec_lifetime": connection_config.ipsec_lifetime,
+            "initiation": connection_config.initiation.value,
+            "psk": connection_config.psk,
         }
 
-        # Check for the connection specific remote id
-        if connection.config.remote_id is not None:
-            swanctl_cfg["remote_id"] = connection.config.remote_id
-        # Check for the connection specific local id
-        if connection.config.local_id is not None:
-            swanctl_cfg["local_id"] = connection.config.local_id
-
-        if connection.config.traffic_selectors:
-            ts_loc = ",".join(str(x) for x in connection.config.traffic_selectors.local)
-            ts_rem = ",".join(
-                str(x) for x in connection.config.traffic_selectors.remote
-            )
-            swanctl_cfg["ts"] = {"local": ts_loc, "remote": ts_rem}
+        if traffic_selectors := connection_config.traffic_selectors:
+            swanctl_cfg["ts"] = {
+                "local": ",".join(str(x) for x in traffic_selectors.local),
+                "remote": ",".join(str(x) for x in traffic_selectors.remote),
+            }
 
         swanctl_cfgs.append(swanctl_cfg)
 
@@ -139,12 +202,16 @@ def generate_config(
         "Generating network instance %s Strongswan configuration.",
         network_instance.id,
     )
-    swanctl_render = swanctl_template.render(connections=swanctl_cfgs)
-    logger.debug(swanctl_render)
-    with swanctl_path.open("w", encoding="utf-8") as f:
-        f.write(swanctl_render)
-
-    os.chown(swanctl_path, config.IPSEC_USER, config.IPSEC_GROUP)
+    # Only build the configuration as a string when it's going to be logged. It's
+    # streamed to the file otherwise.
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(SWANCTL_TEMPLATE.render(connections=swanctl_cfgs))
+    shared.write_template(
+        SWANCTL_TEMPLATE,
+        swanctl_path,
+        {"connections": swanctl_cfgs},
+        owner=(config.IPSEC_USER, config.IPSEC_GROUP),
+    )
 
 
 def stop() -> None:
@@ -153,16 +220,15 @@ def stop() -> None:
         proc = pyroute2.NSPopen(
             config.EXTERNAL_NI,
             # Stop Strongswan in the EXTERNAL network instance.
-            ["ipsec", "stop"],
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
+            ["/usr/sbin/ipsec", "stop"],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
         )
         logger.info(
             "Stopping Strongswan in network instance %s.",
             config.EXTERNAL_NI,
         )
-        stdout, stderr = proc.communicate()
-        logger.debug(stdout, stderr)
+        proc.communicate()
     finally:
         proc.wait()
         proc.release()
@@ -183,20 +249,17 @@ def start() -> None:
             ["/usr/sbin/ipsec", "start"],
             stdout=subprocess.PIPE,
             stderr=subprocess.PIPE,
+            text=True,
         )
         logger.info(
             "Starting Strongswan in network instance %s.",
             config.EXTERNAL_NI,
         )
-        stdout_output, stderr_output = proc.communicate()
+        stdout, stderr = proc.communicate()
         if proc.returncode != 0:
-            logger.critical("Could not start Strongswan\n%s", stderr_output.decode())
+            logger.critical("Could not start Strongswan\n%s", stderr)
             sys.exit(1)
-        if isinstance(stdout_output, bytes):
-            stdout = stdout_output.decode()
-        if isinstance(stderr_output, bytes):
-            stderr = stderr_output.decode()
-        logger.debug(stdout, stderr)
+        logger.debug("%s%s", stdout, stderr)
 
     finally:
         proc.wait()
@@ -211,7 +274,7 @@ def start() -> None:
             vici.Session()
             break
         except (ConnectionRefusedError, FileNotFoundError):
-            if i >= tries:
+            if i >= tries - 1:
                 logger.critical(
                     "VICI socket not available after %s tries. Exiting.",
                     tries,
@@ -5,7 +5,6 @@ import json
 import logging
 import pathlib
 import subprocess
-from ipaddress import IPv4Network
 from typing import Any
 
 import pyroute2
@@ -15,13 +14,17 @@ from vpnc.services import configuration
 
 logger = logging.getLogger("vpnc")
 
+# The translations last written to each vpncmangle configuration file.
+LAST_TRANSLATIONS: dict[pathlib.Path, str] = {}
+
 
 def generate_config() -> None:
     """Generate vpncmangle configuration."""
     output: dict[str, dict[str, Any]] = {}
 
     with shared.VPNCMANGLE_LOCK:
-        for tenant in config.VPNC_CONFIG_TENANT.values():
+        # Tenants may be added by other threads while the translations are built.
+        for tenant in tuple(config.VPNC_CONFIG_TENANT.values()):
             for net_ni in (
                 net_ni
                 for net_ni in tenant.network_instances.values()
@@ -32,7 +35,7 @@ def generate_config() -> None:
                     net_ni,
                 ):
                     output[net_ni.id]["dns64"] = [
-                        (str(nat64_scope), str(IPv4Network("0.0.0.0/0"))),
+                        (str(nat64_scope), "0.0.0.0/0"),
                     ]
                 for connection in net_ni.connections.values():
                     for route6 in connection.routes.ipv6:
@@ -43,10 +46,15 @@ def generate_config() -> None:
                             (str(nptv6_prefix), str(route6.to)),
                         )
 
+        # vpncmangle parses the file again on every change, so it's only written
+        # when the translations differ from the last ones written.
+        translations = json.dumps(output)
         file_path = pathlib.Path("/opt/ncubed/config/vpncmangle/translations.json")
-        file_path.touch(exist_ok=True)
-        with file_path.open("w+", encoding="utf-8") as f:
-            json.dump(output, f)
+        if translations == LAST_TRANSLATIONS.get(file_path) and file_path.exists():
+            logger.debug("vpncmangle translations are unchanged.")
+            return
+        file_path.write_text(translations, encoding="utf-8")
+        LAST_TRANSLATIONS[file_path] = translations
 
 
 def stop(proc: pyroute2.NSPopen) -> None:
@@ -66,8 +74,10 @@ def start() -> None:
         config.CORE_NI,
         # Stop Strongswan in the EXTERNAL network instance.
         [f"{config.VPNC_INSTALL_DIR}/bin/vpncmangle"],
-        stderr=subprocess.PIPE,
-        stdout=subprocess.PIPE,
+        # vpncmangle keeps its own log file. Nothing reads its output, so a pipe
+        # would eventually fill up and block it.
+        stderr=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
     )
 
     atexit.register(stop, proc)
@@ -4,17 +4,15 @@ from __future__ import annotations
 
 import logging
 import pathlib
+import queue
 import subprocess
-import time
+import threading
 from ipaddress import IPv4Address
 from typing import TYPE_CHECKING, Any
 
-import pyroute2
-from jinja2 import Environment, FileSystemLoader
 from watchdog.events import FileSystemEvent, PatternMatchingEventHandler
-from watchdog.observers import Observer
 
-from vpnc import config
+from vpnc import config, shared
 from vpnc.models import enums
 
 if TYPE_CHECKING:
@@ -26,25 +24,69 @@ logger = logging.getLogger("vpnc")
 
 BASE_DIR = pathlib.Path(__file__).parent
 TEMPLATES_DIR = BASE_DIR.joinpath("templates")
-TEMPLATES_ENV = Environment(loader=FileSystemLoader(TEMPLATES_DIR), autoescape=True)
+TEMPLATES_ENV = shared.get_templates_env(TEMPLATES_DIR)
+WIREGUARD_TEMPLATE = TEMPLATES_ENV.get_template("wireguard.conf.j2")
 
 
-def observe() -> BaseObserver:
+def observe() -> BaseObserver:  # noqa: C901
     """Create the observer for wireguard configuration."""
 
     # Define what should happen when downlink files are created, modified or deleted.
     class WireGuardHandler(PatternMatchingEventHandler):
-        """Handler for the event monitoring."""
+        """Handler for the event monitoring.
+
+        Events are not handled directly. They are queued and a single worker loads
+        each changed file once a burst of events has passed.
+        """
+
+        def __init__(self, *args: Any, **kwargs: Any) -> None:  # noqa: ANN401
+            super().__init__(*args, **kwargs)
+            self.events: queue.Queue[str] = queue.Queue()
+            worker = threading.Thread(target=self.reload_worker, daemon=True)
+            worker.start()
 
         def on_created(self, event: FileSystemEvent) -> None:
             logger.info("File %s: %s", event.event_type, event.src_path)
-            time.sleep(0.1)
-            self.reload_config(event.src_path)
+            self.events.put(event.src_path)
 
         def on_modified(self, event: FileSystemEvent) -> None:
             logger.info("File %s: %s", event.event_type, event.src_path)
-            time.sleep(0.1)
-            self.reload_config(event.src_path)
+            self.events.put(event.src_path)
+
+        def on_closed(self, event: FileSystemEvent) -> None:
+            logger.info("File %s: %s", event.event_type, event.src_path)
+            self.events.put(event.src_path)
+
+        def on_moved(self, event: FileSystemEvent) -> None:
+            logger.info(
+                "File %s: %s to %s",
+                event.event_type,
+                event.src_path,
+                event.dest_path,
+            )
+            self.events.put(event.dest_path)
+
+        def reload_worker(self) -> None:
+            """Load each changed configuration once per burst of file events."""
+            while not shared.STOP_EVENT.is_set():
+                try:
+                    files = {self.events.get(timeout=1): None}
+                except queue.Empty:
+                    continue
+                # A file is created and modified several times while it's written.
+                while True:
+                    try:
+                        files[self.events.get(timeout=0.1)] = None
+                    except queue.Empty:
+                        break
+                for file in files:
+                    # The connection may have been removed in the meantime.
+                    if not pathlib.Path(file).exists():
+                        continue
+                    try:
+                        self.reload_config(file)
+                    except Exception:
+                        logger.exception("Failed to load wireguard config %s", file)
 
         # ###########################################################################################
         # def on_deleted(self, event: FileSystemEvent) -> None:
@@ -57,17 +99,26 @@ def observe() -> BaseObserver:
             intf_name = pathlib.Path(file).stem
             logger.info("Loading wireguard connection %s.", intf_name)
             network_instance_name = intf_name[3:-2]
-            proc = pyroute2.NSPopen(
-                network_instance_name,
-                ["/usr/bin/wg", "setconf", intf_name, file],
+            proc = subprocess.run(  # noqa: S603
+                [
+                    "/usr/sbin/ip",
+                    "netns",
+                    "exec",
+                    network_instance_name,
+                    "/usr/bin/wg",
+                    "setconf",
+                    intf_name,
+                    file,
+                ],
                 stdout=subprocess.PIPE,
+                text=True,
+                check=False,
             )
-            logger.info(proc.stdout)
-            proc.wait()
-            proc.release()
+            if proc.stdout:
+                logger.info(proc.stdout)
 
     # Create the observer object. This doesn't start the handler.
-    observer: BaseObserver = Observer()
+    observer = shared.create_observer(config.WIREGUARD_CONFIG_DIR)
 
     # Configure the event handler that watches directories.
     # This doesn't start the handler.
@@ -75,6 +126,7 @@ def observe() -> BaseObserver:
         event_handler=WireGuardHandler(patterns=["wg*.conf"], ignore_directories=True),
         path=config.WIREGUARD_CONFIG_DIR,
         recursive=False,
+        event_filter=shared.get_event_filter(observer),
     )
     # The handler should exit on main thread close
     observer.daemon = True
@@ -86,8 +138,6 @@ def generate_config(
     network_instance: NetworkInstance,
 ) -> None:
     """Generate wireguard configurations."""
-    wg_template = TEMPLATES_ENV.get_template("wireguard.conf.j2")
-
     for connection in network_instance.connections.values():
         if connection.config.type != enums.ConnectionType.WIREGUARD:
             continue
@@ -114,8 +164,6 @@ def generate_config(
             "public_key": connection.config.public_key,
         }
 
-        wg_render = wg_template.render(**wg_cfg)
-
         logger.info(
             "Generating network instance %s connection %s WireGuard configuration.",
             network_instance.id,
@@ -124,5 +172,4 @@ def generate_config(
         wg_path = config.WIREGUARD_CONFIG_DIR.joinpath(
             f"wg-{network_instance.id}-{connection.id}.conf",
         )
-        with wg_path.open("w", encoding="utf-8") as f:
-            f.write(wg_render)
+        shared.write_template(WIREGUARD_TEMPLATE, wg_path, wg_cfg)
@@ -2,7 +2,32 @@
 
 from __future__ import annotations
 
+import logging
+import os
 import threading
+from typing import TYPE_CHECKING, Any
+
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader
+from watchdog.events import (
+    FileClosedEvent,
+    FileCreatedEvent,
+    FileDeletedEvent,
+    FileModifiedEvent,
+    FileMovedEvent,
+    FileSystemEvent,
+)
+from watchdog.observers import Observer
+from watchdog.observers.polling import PollingObserver
+
+from vpnc import config
+
+if TYPE_CHECKING:
+    import pathlib
+
+    from jinja2 import Template
+    from watchdog.observers.api import BaseObserver
+
+logger = logging.getLogger("vpnc")
 
 # Define a global stop event
 STOP_EVENT = threading.Event()
@@ -16,3 +41,119 @@ NI_START_LOCK = threading.Lock()
 
 # Lock to update/reload the vpncmangle configuration.
 VPNCMANGLE_LOCK = threading.Lock()
+
+# Lock to write the FRR configuration.
+FRR_LOCK = threading.Lock()
+
+
+def get_templates_cache() -> FileSystemBytecodeCache | None:
+    """Return the bytecode cache for the Jinja template environments.
+
+    The templates are compiled without a cache if the directory can't be created,
+    for example when running as an unprivileged user.
+    """
+    try:
+        config.VPNC_TEMPLATES_CACHE_DIR.mkdir(mode=0o700, parents=True, exist_ok=True)
+    except OSError:
+        logger.debug("Template cache directory is unavailable.", exc_info=True)
+        return None
+    return FileSystemBytecodeCache(directory=str(config.VPNC_TEMPLATES_CACHE_DIR))
+
+
+def get_templates_env(templates_dir: pathlib.Path) -> Environment:
+    """Return the Jinja environment for the templates in a package directory.
+
+    The templates are part of the package and don't change while running, so they
+    aren't checked for changes and their compiled code is cached.
+    """
+    return Environment(
+        loader=FileSystemLoader(templates_dir),
+        autoescape=True,
+        auto_reload=False,
+        bytecode_cache=get_templates_cache(),
+    )
+
+
+def get_fs_type(path: pathlib.Path) -> str | None:
+    """Return the type of the file system a path is on."""
+    path_str = str(path.resolve())
+    mount_point = ""
+    fs_type: str | None = None
+    try:
+        with open("/proc/self/mountinfo", encoding="utf-8") as f:  # noqa: PTH123
+            for line in f:
+                mount_fields, _, fs_fields = line.partition(" - ")
+                mount = mount_fields.split()[4]
+                if not (
+                    path_str == mount or path_str.startswith(f"{mount.rstrip('/')}/")
+                ):
+                    continue
+                # Later mounts on the same mount point hide the earlier ones.
+                if len(mount) >= len(mount_point):
+                    mount_point = mount
+                    fs_type = fs_fields.split()[0]
+    except (OSError, IndexError):
+        logger.warning("Could not determine the file system of %s.", path)
+        return None
+
+    return fs_type
+
+
+def create_observer(path: pathlib.Path) -> BaseObserver:
+    """Create a file system observer for a directory.
+
+    inotify doesn't see all changes on network and overlay file systems. Directories
+    on these file systems are polled instead.
+    """
+    mode = config.WATCHER_MODE
+    if mode not in ("inotify", "polling"):
+        fs_type = get_fs_type(path) or ""
+        mode = "inotify"
+        if fs_type.split(".")[0] in config.WATCHER_POLLING_FS_TYPES:
+            mode = "polling"
+
+    if mode == "polling":
+        logger.info(
+            "Polling %s for changes every %s seconds.",
+            path,
+            config.WATCHER_POLLING_INTERVAL,
+        )
+        return PollingObserver(timeout=config.WATCHER_POLLING_INTERVAL)
+
+    return Observer()
+
+
+def get_event_filter(observer: BaseObserver) -> list[type[FileSystemEvent]]:
+    """Return the events that indicate a finished change to a file.
+
+    Subscribing to these only keeps inotify from waking the observer for every write
+    to a file. A file moved in from another directory is reported as created, not
+    moved. Polling doesn't detect closed files, only created and modified ones.
+    """
+    event_filter: list[type[FileSystemEvent]] = [
+        FileClosedEvent,
+        FileCreatedEvent,
+        FileDeletedEvent,
+        FileMovedEvent,
+    ]
+    if isinstance(observer, PollingObserver):
+        event_filter.append(FileModifiedEvent)
+    return event_filter
+
+
+def write_template(
+    template: Template,
+    path: pathlib.Path,
+    context: dict[str, Any],
+    owner: tuple[int, int] | None = None,
+) -> None:
+    """Render a template to a file and move it in place.
+
+    The rendered configuration is streamed to a hidden temporary file, so neither
+    the observers nor the services read a partially written file.
+    """
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    template.stream(**context).dump(str(tmp_path), encoding="utf-8")
+    if owner is not None:
+        os.chown(tmp_path, *owner)
+    tmp_path.replace(path)
@@ -3,6 +3,7 @@
 from __future__ import annotations
 
 # needed for pydantic to create the classes
+import functools
 import ipaddress  # noqa: TCH003
 import logging
 import pathlib
@@ -18,14 +19,36 @@ class VpncMangleConfig(pydantic.BaseModel):
     dns64: list[tuple[ipaddress.IPv6Network, ipaddress.IPv4Network]]
     dns66: list[tuple[ipaddress.IPv6Network, ipaddress.IPv6Network]]
 
-
-class Config(pydantic.BaseModel):
-    """Object to check for validity."""
-
-    config: dict[str, VpncMangleConfig]
-
+    @functools.cached_property
+    def dns64_prefix(self) -> bytes | None:
+        """The first 12 bytes of the DNS64 prefix, IPv4 addresses are appended."""
+        if not self.dns64:
+            return None
+        return self.dns64[0][0].network_address.packed[:12]
+
+    @functools.cached_property
+    def dns66_rules(self) -> list[tuple[int, int, int]]:
+        """The DNS66 translations as integers.
+
+        Each rule consists of the local and remote network address and the netmask of
+        the remote network.
+        """
+        return [
+            (
+                int(local_network.network_address),
+                int(remote_network.network_address),
+                int(remote_network.netmask),
+            )
+            for local_network, remote_network in self.dns66
+        ]
+
+
+# Validates the configuration file contents directly, without a wrapping model.
+CONFIG_ADAPTER = pydantic.TypeAdapter(dict[str, VpncMangleConfig])
 
 CONFIG_PATH = pathlib.Path("/opt/ncubed/config/vpncmangle/translations.json")
 CONFIG: dict[str, VpncMangleConfig] = {}
 
-ACL_MATCH: list[tuple[ipaddress.IPv6Network, str]] = []
+# Network instance names by prefix length and network address, shifted to the prefix
+# length. Ordered from the longest prefix length to the shortest.
+ACL_MATCH: dict[int, dict[int, str]] = {}
@@ -1,6 +1,6 @@
 """Helper functions providing functions used throughout the application."""
 
-import json
+import itertools
 import logging
 
 import pydantic_core
@@ -13,16 +13,7 @@ logger = logging.getLogger("vpncmangle")
 def load_config() -> None:
     """Load the global configuration."""
     try:
-        with config.CONFIG_PATH.open(encoding="utf-8") as f:
-            try:
-                new_cfg_dict = json.load(f)
-            except (json.JSONDecodeError, TypeError):
-                logger.critical(
-                    "Configuration is not valid '%s'.",
-                    config.CONFIG_PATH,
-                    exc_info=True,
-                )
-                return
+        new_cfg_json = config.CONFIG_PATH.read_bytes()
     except FileNotFoundError:
         logger.warning(
             "Configuration file could not be found at '%s'. Skipping",
@@ -30,22 +21,42 @@ def load_config() -> None:
         )
         return
 
+    # The JSON is parsed and validated in one pass by pydantic.
     try:
-        config.CONFIG = config.Config(config=new_cfg_dict).config
-    except pydantic_core.ValidationError:
-        logger.exception(
-            "Configuration '%s' doesn't adhere to the schema. Skipping",
-            config.CONFIG_PATH,
-        )
+        config.CONFIG = config.CONFIG_ADAPTER.validate_json(new_cfg_json)
+    except pydantic_core.ValidationError as err:
+        if any(x["type"] == "json_invalid" for x in err.errors()):
+            logger.critical(
+                "Configuration is not valid '%s'.",
+                config.CONFIG_PATH,
+                exc_info=True,
+            )
+        else:
+            logger.exception(
+                "Configuration '%s' doesn't adhere to the schema. Skipping",
+                config.CONFIG_PATH,
+            )
         return
 
-    config.ACL_MATCH.clear()
-
+    # The source address of a response is matched with the longest prefix, using a
+    # dictionary lookup per prefix length.
+    acl_match: dict[int, dict[int, str]] = {}
     for net_in_name, net_in_translations in config.CONFIG.items():
-        translation_list_64 = [(x[0], net_in_name) for x in net_in_translations.dns64]
-        translation_list_66 = [(x[0], net_in_name) for x in net_in_translations.dns66]
-        translation_list = translation_list_64 + translation_list_66
-
-        config.ACL_MATCH.extend(translation_list)
+        # Calculate the translations once, so the workers receive them with the
+        # configuration.
+        net_in_translations.dns64_prefix  # noqa: B018
+        net_in_translations.dns66_rules  # noqa: B018
+        for translation in itertools.chain(
+            net_in_translations.dns64,
+            net_in_translations.dns66,
+        ):
+            local_network = translation[0]
+            acl_match.setdefault(local_network.prefixlen, {}).setdefault(
+                int(local_network.network_address) >> 128 - local_network.prefixlen,
+                net_in_name,
+            )
+    # Replace the mapping in one step, so packets handled meanwhile never see an
+    # empty one.
+    config.ACL_MATCH = dict(sorted(acl_match.items(), reverse=True))
 
     logger.info("Loaded new configuration.")
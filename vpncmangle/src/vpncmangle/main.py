@@ -1,14 +1,21 @@
 """Mangle/doctor DNS responses."""
 
 import logging
+import multiprocessing
+import multiprocessing.connection
+import os
+import random
+import signal
+import socket
+import string
+import struct
 import subprocess
 import sys
-from ipaddress import IPv4Address, IPv6Address
+import threading
 from logging.handlers import RotatingFileHandler
-from time import sleep
-from typing import Any
+from multiprocessing.connection import Connection
+from time import monotonic, sleep
 
-import scapy.all as sc
 from netfilterqueue import NetfilterQueue, Packet
 
 from . import config, helpers, observers
@@ -18,23 +25,75 @@ logger = logging.getLogger("vpncmangle")
 
 QUERY_A = 1
 QUERY_AAAA = 28
-
-
-def setup_ip6tables(queue_number: int) -> None:
+QUERY_OPT = 41
+# The answer types that are mangled, with the length of their data.
+RDATA_LENGTHS = {QUERY_A: 4, QUERY_AAAA: 16}
+RCODE_NXDOMAIN = 3
+
+PROTO_UDP = 17
+IPV6_HEADER_LEN = 40
+IPV6_NEXT_HEADER_OFFSET = 6
+UDP_HEADER_LEN = 8
+DNS_OFFSET = IPV6_HEADER_LEN + UDP_HEADER_LEN
+# ID, flags, question, answer, authority and additional record counts.
+DNS_HEADER = struct.Struct("!HHHHHH")
+# Type, class, TTL and data length of a resource record.
+RR_HEADER = struct.Struct("!HHIH")
+# Lengths, checksums and compression pointers.
+UINT16 = struct.Struct("!H")
+# Compression pointers a name may follow, so pointer loops are detected.
+MAX_POINTER_JUMPS = 256
+
+# Packets the kernel queues while a packet is handled and the receive buffer of the
+# netfilter socket. Bursts of DNS responses are buffered instead of dropped.
+QUEUE_MAX_LEN = 4096
+QUEUE_SOCKET_SIZE = QUEUE_MAX_LEN * 2048
+# Packets are mangled one at a time by the netfilter queue callback, so a single
+# buffer is reused for all of them. It fits the largest IPv6 packet and a padding byte
+# for the checksum. Packets that would grow larger can't be mangled.
+PACKET_BUFFER = memoryview(bytearray(IPV6_HEADER_LEN + 0xFFFF + 1))
+# A worker process per CPU, each with its own netfilter queue. The kernel spreads the
+# responses over the queues by the CPU that handles them.
+WORKERS = os.cpu_count() or 1
+# Forked workers inherit the netfilter queues bound by the main process.
+MP_CONTEXT = multiprocessing.get_context("fork")
+# Delays in seconds before restarting failed workers.
+RESTART_DELAY = 0.1
+RESTART_DELAY_MAX = 5.0
+RESTART_RESET_AFTER = 60
+# The running workers, with their netfilter queue and the pipe the configuration is
+# sent to them with.
+WORKER_PROCESSES: dict[multiprocessing.Process, tuple[NetfilterQueue, Connection]] = {}
+WORKER_PROCESSES_LOCK = threading.Lock()
+
+
+# Replaces the mangle table with the DNS64 mangle rules. Loaded with ip6tables-restore,
+# so no shell is needed and the rules are applied at once. Responses bypass the queues
+# instead of being dropped when no worker is attached to them.
+# TODO@draggeta: fix DNS over TCP
+IP6TABLES_RULES_TEMPLATE = string.Template(
+    """*mangle
+-A POSTROUTING -p udp -m udp --sport 53 -j NFQUEUE ${queues} --queue-bypass
+# -A POSTROUTING -p tcp -m tcp --sport 53 -j NFQUEUE ${queues} --queue-bypass
+COMMIT
+""",
+)
+
+
+def setup_ip6tables(first_queue: int, last_queue: int) -> None:
     """Configure ip6tables to capture DNS responses."""
-    # TODO@draggeta: fix DNS over TCP
-    proc = subprocess.run(  # noqa: S602
-        f"""
-        # Configure DNS64 mangle
-        /usr/sbin/ip6tables -t mangle -F
-        /usr/sbin/ip6tables -t mangle -A POSTROUTING -p udp -m udp --sport 53 -j NFQUEUE --queue-num {queue_number}
-        # /usr/sbin/ip6tables -t mangle -A POSTROUTING -p tcp -m tcp --sport 53 -j NFQUEUE --queue-num {queue_number}
-        """,
+    queues = f"--queue-num {first_queue}"
+    if last_queue > first_queue:
+        queues = f"--queue-balance {first_queue}:{last_queue} --queue-cpu-fanout"
+    rules = IP6TABLES_RULES_TEMPLATE.substitute(queues=queues)
+    proc = subprocess.run(
+        ["/usr/sbin/ip6tables-restore"],
+        input=rules,
         stdout=subprocess.PIPE,
-        shell=True,
+        text=True,
         check=True,
     )
-    logger.info(proc.args)
+    logger.info("Loaded ip6tables rules:\n%s", rules)
     logger.debug(proc.stdout)
 
 
@@ -50,35 +109,260 @@ def clean_ip6tables() -> None:
     logger.debug(proc.stdout)
 
 
+def skip_name(buf: bytes, offset: int) -> int:
+    """Return the offset of the first byte after a DNS name."""
+    while length := buf[offset]:
+        # A compression pointer always ends the name.
+        if length & 0xC0 == 0xC0:  # noqa: PLR2004
+            return offset + 2
+        if length & 0xC0:
+            msg = f"Unsupported DNS label type at offset {offset}."
+            raise ValueError(msg)
+        offset += length + 1
+    return offset + 1
+
+
+def read_name(buf: bytes, offset: int) -> str:
+    """Read a, possibly compressed, DNS name from a packet.
+
+    Compression pointers are relative to the start of the DNS message, so the packet
+    isn't copied to resolve them.
+    """
+    labels: list[str] = []
+    jumps = 0
+    while length := buf[offset]:
+        if length & 0xC0 == 0xC0:  # noqa: PLR2004
+            # Guard against compression pointer loops.
+            jumps += 1
+            if jumps > MAX_POINTER_JUMPS:
+                msg = "Too many DNS name compression pointers."
+                raise ValueError(msg)
+            offset = DNS_OFFSET + ((length & 0x3F) << 8 | buf[offset + 1])
+            continue
+        labels.append(buf[offset + 1 : offset + 1 + length].decode(errors="replace"))
+        offset += length + 1
+    return ".".join(labels) + "."
+
+
+def format_address(packed: bytes) -> str:
+    """Format a packed IPv4 or IPv6 address for logging."""
+    family = socket.AF_INET if len(packed) == 4 else socket.AF_INET6  # noqa: PLR2004
+    return socket.inet_ntop(family, packed)
+
+
+def set_udp_checksum(buf: memoryview, length: int) -> None:
+    """Set the lengths and UDP checksum of an IPv6 packet without extension headers.
+
+    The buffer must have room for a padding byte after the packet.
+    """
+    udp_length = length - IPV6_HEADER_LEN
+    UINT16.pack_into(buf, 4, udp_length)
+    UINT16.pack_into(buf, IPV6_HEADER_LEN + 4, udp_length)
+    UINT16.pack_into(buf, IPV6_HEADER_LEN + 6, 0)
+    # The one's complement sum of the 16 bit words is congruent to the packet read as
+    # a single number modulo 0xFFFF, so it's calculated at once. An odd length is
+    # padded.
+    buf[length] = 0
+    # The pseudo header consists of the addresses, UDP length and next header.
+    total = int.from_bytes(buf[8:IPV6_HEADER_LEN], "big") + udp_length + PROTO_UDP
+    total += int.from_bytes(buf[IPV6_HEADER_LEN : length + (udp_length & 1)], "big")
+    # A checksum of 0 means no checksum was calculated, so 0xFFFF is used instead.
+    UINT16.pack_into(buf, IPV6_HEADER_LEN + 6, 0xFFFF - total % 0xFFFF)
+
+
+def translate_dns66(
+    address: bytes,
+    rules: list[tuple[int, int, int]],
+) -> bytes | None:
+    """Replace the remote prefix of an IPv6 address with the local prefix."""
+    address_int = int.from_bytes(address, "big")
+    for local, remote, netmask in rules:
+        if address_int & netmask == remote:
+            return (local + address_int - remote).to_bytes(16, "big")
+    return None
+
+
+def mangle_rdata(
+    rr_type: int,
+    rdata: bytes,
+    dns64_prefix: bytes | None,
+    dns66_rules: list[tuple[int, int, int]],
+) -> bytes | None:
+    """Return the translated IPv6 address of an 'A' or 'AAAA' answer, if possible."""
+    if len(rdata) != RDATA_LENGTHS[rr_type]:
+        msg = f"DNS answer data of type '{rr_type}' has an invalid length."
+        raise ValueError(msg)
+    dns_response_doctored: bytes | None = None
+    if rr_type == QUERY_A:
+        if dns64_prefix is not None:
+            dns_response_doctored = dns64_prefix + rdata
+    else:
+        dns_response_doctored = translate_dns66(rdata, dns66_rules)
+
+    if dns_response_doctored is None:
+        logger.error(
+            "DNS response answer type '%s' with response '%s' couldn't be mangled. Ignoring",
+            rr_type,
+            format_address(rdata),
+        )
+    return dns_response_doctored
+
+
+def get_opt_records(
+    payload: bytes,
+    offset: int,
+    nscount: int,
+    arcount: int,
+) -> tuple[bytes, int]:
+    """Return the EDNS OPT records of the authority and additional sections.
+
+    Records in these sections may point to names in the answer section, which has
+    moved. Only the EDNS OPT record is kept, as it never contains a name.
+    """
+    records: list[bytes] = []
+    for index in range(nscount + arcount):
+        record_offset = offset
+        offset = skip_name(payload, offset)
+        rr_type, _, _, rdlength = RR_HEADER.unpack_from(payload, offset)
+        offset += RR_HEADER.size + rdlength
+        if index >= nscount and rr_type == QUERY_OPT:
+            records.append(payload[record_offset:offset])
+    return b"".join(records), len(records)
+
+
+def mangle_response(
+    payload: bytes,
+    mangle_config: config.VpncMangleConfig,
+) -> bytes:
+    """Rewrite the answers of a DNS response to translated 'AAAA' answers.
+
+    The packet is edited on the wire format. Only the answer section is rebuilt, the
+    headers and question section are copied as is.
+    """
+    dns_id, flags, qdcount, ancount, nscount, arcount = DNS_HEADER.unpack_from(
+        payload,
+        DNS_OFFSET,
+    )
+    offset = DNS_OFFSET + DNS_HEADER.size
+    for _ in range(qdcount):
+        # Skip the name, type and class.
+        offset = skip_name(payload, offset) + 4
+    answers_offset = offset
+
+    # Checked once, the messages and their arguments are only built when logged.
+    debug = logger.isEnabledFor(logging.DEBUG)
+    dns64_prefix = mangle_config.dns64_prefix
+    dns66_rules = mangle_config.dns66_rules
+
+    # All answers get the name of the first answer, so CNAME chains are left out.
+    # Answers after the first one point to the name of the first one, compression
+    # pointers are relative to the start of the DNS message.
+    rrname = b""
+    rrname_pointer = UINT16.pack(0xC000 | answers_offset - DNS_OFFSET)
+    # The parts of the answers are collected and written to the buffer at once.
+    answers: list[bytes] = []
+    answer_count = 0
+    for _ in range(ancount):
+        name_offset = offset
+        offset = skip_name(payload, offset)
+        if not rrname:
+            rrname = payload[name_offset:offset]
+        rr_type, rr_class, ttl, rdlength = RR_HEADER.unpack_from(payload, offset)
+        offset += RR_HEADER.size
+        rdata = payload[offset : offset + rdlength]
+        offset += rdlength
+        if len(rdata) != rdlength:
+            msg = "DNS answer data is truncated."
+            raise ValueError(msg)
+        if rr_type not in RDATA_LENGTHS:
+            if debug:
+                logger.debug(
+                    "DNS response answer type '%s' is not of a configured type. "
+                    "Ignoring.",
+                    rr_type,
+                )
+            continue
+        if (
+            doctored := mangle_rdata(rr_type, rdata, dns64_prefix, dns66_rules)
+        ) is None:
+            continue
+        if debug:
+            logger.debug(
+                "DNS response answer for '%s' translated from '%s' to '%s'.",
+                read_name(payload, name_offset),
+                format_address(rdata),
+                format_address(doctored),
+            )
+        answers += (
+            rrname_pointer if answer_count else rrname,
+            RR_HEADER.pack(QUERY_AAAA, rr_class, ttl, len(doctored)),
+            doctored,
+        )
+        answer_count += 1
+
+    additionals, additional_count = get_opt_records(payload, offset, nscount, arcount)
+    answers.append(additionals)
+
+    # The packet is written to the reused buffer, starting with the unchanged part.
+    records = b"".join(answers)
+    length = answers_offset + len(records)
+    buf = PACKET_BUFFER
+    buf[:answers_offset] = payload[:answers_offset]
+    buf[answers_offset:length] = records
+
+    # If there are no valid responses (can happen if only AAAA records are returned and
+    # discarded), return NXDOMAIN.
+    if not answer_count:
+        flags = flags & 0xFFF0 | RCODE_NXDOMAIN
+
+    DNS_HEADER.pack_into(
+        buf,
+        DNS_OFFSET,
+        dns_id,
+        flags,
+        qdcount,
+        answer_count,
+        0,
+        additional_count,
+    )
+    set_udp_checksum(buf, length)
+    return bytes(buf[:length])
+
+
 def mangle_dns(pkt: Packet) -> None:
     """Mangle DNS responses of the 'A' type."""
-    pkt_sc = sc.IPv6(pkt.get_payload())
+    payload = pkt.get_payload()
 
-    # If not DNS record.
-    if not pkt_sc.haslayer(sc.DNS):
+    # If not DNS record. Extension headers aren't expected on DNS responses.
+    if (
+        len(payload) < DNS_OFFSET + DNS_HEADER.size
+        or payload[IPV6_NEXT_HEADER_OFFSET] != PROTO_UDP
+    ):
         logger.warning("Captured packet without DNS response.")
-        logger.warning(pkt_sc)
+        logger.warning(payload.hex())
         pkt.accept()
         return
+    # The checks read single bytes of the DNS header, so packets that aren't mangled
+    # are accepted without unpacking it.
     # If not a response (QR field, query is 0, response 1).
-    if pkt_sc[sc.DNS].qr != 1:
+    if not payload[DNS_OFFSET + 2] & 0x80:
         logger.debug("Packet is not of type response.")
         pkt.accept()
         return
     # If return code is not ok.
-    if pkt_sc[sc.DNS].rcode != 0:
-        logger.debug("Packet response indicates error.\n%s", pkt_sc[sc.DNS])
+    if rcode := payload[DNS_OFFSET + 3] & 0x0F:
+        logger.debug("Packet response indicates error %s.", rcode)
         pkt.accept()
         return
     # If no answers in DNS.
-    if not pkt_sc[sc.DNS].an:
+    if not (payload[DNS_OFFSET + 6] or payload[DNS_OFFSET + 7]):
         logger.debug("Packet response contains no answers.")
         pkt.accept()
         return
 
     # The source address of the response (basically the DNS resolver). This IP is
     # most likely translated by NAT64 or NPTv6
-    ipv6_src_addr = IPv6Address(pkt_sc.src)
+    ipv6_src_addr = int.from_bytes(payload[8:24], "big")
 
     # vpncmangle has no idea where the response comes from. It requires the mapping
     # configuration to know this.
@@ -88,147 +372,113 @@ def mangle_dns(pkt: Packet) -> None:
         pkt.drop()
         return
     network_instance_name: str | None = None
-    for local_network, ni_name in config.ACL_MATCH:
-        if ipv6_src_addr in local_network:
+    for prefixlen, networks in config.ACL_MATCH.items():
+        if (ni_name := networks.get(ipv6_src_addr >> 128 - prefixlen)) is not None:
             network_instance_name = ni_name
             break
 
     if network_instance_name is None:
         logger.error(
             "IPv6 source address '%s' doesn't seem to match any configured address/network instance",
-            ipv6_src_addr,
+            format_address(payload[8:24]),
         )
         pkt.drop()
         return
 
-    # Temporary list to store all desired DNS responses.
-    temp_list: list[dict[str, Any]] = []
-    rrname = pkt_sc[sc.DNS].an.rrname
-    for dns_query in pkt_sc[sc.DNS].an.iterpayloads():
-        # # If AAAA record response, don't include it.
-        # if i.type == 28:
-        #     logger.debug("DNS response answer is 'AAAA'. Ignoring.")
-        #     continue
-        # # If CNAME record, get all addresses
-        # if i.type == 5:
-        #     logger.debug("DNS response answer is 'CNAME'. Ignoring.")
-        #     continue
-        # If not A record response, then include unedited
-        # if i.type != 1:
-        #     logger.debug("DNS response answer is not 'A'. Ignoring.")
-        #     # temp_list.append(i)
-        #     continue
-
-        dns_response: IPv4Address | IPv6Address | None = None
-        dns_response_doctored: IPv6Address | None = None
-        if dns_query.type == QUERY_A:
-            logger.debug("DNS response '%s' answer is 'A'.", dns_query.rdata)
-            ipv6_local_network, _ = config.CONFIG[network_instance_name].dns64[0]
-            # Calculate address.
-            dns_response = IPv4Address(dns_query.rdata)
-            dns_response_doctored = IPv6Address(
-                int(ipv6_local_network.network_address) + int(dns_response),
-            )
-        elif dns_query.type == QUERY_AAAA:
-            logger.debug("DNS response '%s' answer is 'AAAA'.", dns_query.rdata)
-            for ipv6_local_network, ipv6_remote_network in config.CONFIG[
-                network_instance_name
-            ].dns66:
-                dns_response = IPv6Address(dns_query.rdata)
-                if dns_response in ipv6_remote_network:
-                    # Quit early if it is a network that isn't translated.
-                    if ipv6_remote_network == ipv6_local_network:
-                        dns_response_doctored = dns_response
-                        break
-                    host_part = int(dns_response) - int(
-                        ipv6_remote_network.network_address,
-                    )
-                    dns_response_doctored = IPv6Address(
-                        int(ipv6_local_network.network_address) + host_part,
-                    )
-                    break
-        else:
+    try:
+        pkt.set_payload(
+            mangle_response(payload, config.CONFIG[network_instance_name]),
+        )
+        pkt.accept()
+        logger.debug("Packet sent.")
+    except Exception:
+        logger.warning("Error occurred mangling DNS.", exc_info=True)
+        pkt.drop()
+
+
+def bind_queues(retries: int = 10) -> list[NetfilterQueue]:
+    """Bind a range of netfilter queues, one per worker."""
+    for first_queue in range(0, retries * WORKERS, WORKERS):
+        nfqueues: list[NetfilterQueue] = []
+        try:
+            for queue_number in range(first_queue, first_queue + WORKERS):
+                nfqueue = NetfilterQueue()
+                nfqueue.bind(
+                    queue_number,
+                    mangle_dns,
+                    max_len=QUEUE_MAX_LEN,
+                    sock_len=QUEUE_SOCKET_SIZE,
+                )
+                nfqueues.append(nfqueue)
+        except (ImportError, OSError):
             logger.debug(
-                "DNS response answer type '%s' is not of a configured type. Ignoring.",
-                dns_query.type,
+                "Attaching to netfilter queue %s failed, retrying.",
+                queue_number,
             )
+            for nfqueue in nfqueues:
+                nfqueue.unbind()
             continue
+        setup_ip6tables(first_queue, first_queue + WORKERS - 1)
+        return nfqueues
+    logger.critical("Could not find available netfilter queues.")
+    sys.exit(1)
 
-        # # Include an invalid IPv4 address just to make sure that Windows caches it correctly.
-        # # This seems to break in Linux if preference isn't set.
-        # if not temp_v4_list:
-        #     temp_v4_dict = {
-        #         "rrname": rrname,
-        #         "type": i.type,
-        #         "rclass": i.rclass,
-        #         "ttl": i.ttl,
-        #         "rdata": "0.0.0.254",
-        #     }
-        #     temp_v4_list.append(temp_v4_dict)
-
-        if not dns_response_doctored:
-            logger.error(
-                "DNS response answer type '%s' with response '%s' couldn't be mangled. Ignoring",
-                dns_query.type,
-                dns_query.rdata,
-            )
-            continue
 
-        logger.debug(
-            "DNS response answer for '%s' translated from '%s' to '%s'.",
-            dns_query.rrname.decode(),
-            dns_response,
-            dns_response_doctored,
-        )
-        # Change the response type and answer.
-        temp_dict: dict[str, Any] = {
-            "rrname": rrname,
-            "type": "AAAA",
-            "rclass": dns_query.rclass,
-            "ttl": dns_query.ttl,
-            "rdata": str(dns_response_doctored),
-        }
-
-        # Append the result to the list.
-        temp_list.append(temp_dict)
-
-    dns_mangle = sc.DNSRR()
-    for dns_query, val in enumerate(temp_list):
-        if dns_query > 0:
-            dns_mangle = dns_mangle / sc.DNSRR()
-        dns_mangle[dns_query].rrname = val["rrname"]
-        dns_mangle[dns_query].type = val["type"]
-        dns_mangle[dns_query].rclass = val["rclass"]
-        dns_mangle[dns_query].ttl = val["ttl"]
-        dns_mangle[dns_query].rdata = val["rdata"]
+def receive_config(conn: Connection) -> None:
+    """Replace the configuration with the ones sent by the main process."""
+    while True:
+        try:
+            config.CONFIG, config.ACL_MATCH = conn.recv()
+        except EOFError:
+            return
 
-    # If there are no valid responses (can happen if only AAAA records are returned and
-    # discarded), return NXDOMAIN.
-    if len(temp_list) == 0:
-        pkt_sc[sc.DNS].ancount = 0
-        pkt_sc[sc.DNS].an = None
-        pkt_sc[sc.DNS].rcode = 3
-    else:
-        # Set the list as the answers value and edit the count.
-        pkt_sc[sc.DNS].an = dns_mangle
-        pkt_sc[sc.DNS].ancount = len(temp_list)
 
-    # Reset/calculate the correct values for lower layers.
-    del pkt_sc[sc.IPv6].plen
-    del pkt_sc[sc.UDP].len
-    del pkt_sc[sc.UDP].chksum
+def run_worker(nfqueue: NetfilterQueue, conn: Connection) -> None:
+    """Mangle the DNS responses of a netfilter queue."""
+    # The main process loads the configuration once and sends it to every worker.
+    receiver = threading.Thread(target=receive_config, args=(conn,), daemon=True)
+    receiver.start()
 
     try:
-        pkt.set_payload(bytes(pkt_sc))
-        pkt.accept()
-        logger.debug("Packet sent.")
+        logger.info("Starting mangle process.")
+        nfqueue.run()
+    except KeyboardInterrupt:
+        logger.info("Exiting mangle process.")
     except Exception:
-        logger.warning("Error occurred mangling DNS.", exc_info=True)
-        pkt.drop()
+        logger.critical("Mangle process ended prematurely.", exc_info=True)
+        sys.exit(1)
+
+
+def start_worker(nfqueue: NetfilterQueue) -> None:
+    """Start a worker process for a netfilter queue.
+
+    The worker inherits the loaded configuration and receives the ones loaded later.
+    """
+    receive_conn, send_conn = MP_CONTEXT.Pipe(duplex=False)
+    process = MP_CONTEXT.Process(
+        target=run_worker,
+        args=(nfqueue, receive_conn),
+        daemon=True,
+    )
+    process.start()
+    receive_conn.close()
+    WORKER_PROCESSES[process] = (nfqueue, send_conn)
+
+
+def reload_config() -> None:
+    """Load the configuration and send it to the workers."""
+    helpers.load_config()
+    with WORKER_PROCESSES_LOCK:
+        for process, (_, conn) in WORKER_PROCESSES.items():
+            try:
+                conn.send((config.CONFIG, config.ACL_MATCH))
+            except OSError:
+                # The worker is restarted with the loaded configuration.
+                logger.debug("Mangle worker %s is not running.", process.name)
 
 
 def main() -> None:
-    """Set up netfilter and try to keep the mangle_dns function alive."""
+    """Set up netfilter and try to keep the mangle workers alive."""
     # LOGGER
     # Configure logging
     logger.setLevel(level=logging.INFO)
@@ -245,45 +495,48 @@ def main() -> None:
     logger.addHandler(rothandler)
     logger.addHandler(logging.StreamHandler(sys.stdout))
 
-    nfqueue = NetfilterQueue()
-    retries = 10
+    # vpnc stops vpncmangle with SIGTERM. Handle it like an interrupt, so the rules
+    # are removed and the daemonic workers are terminated on exit.
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
 
     helpers.load_config()
+    nfqueues = bind_queues()
+    with WORKER_PROCESSES_LOCK:
+        for nfqueue in nfqueues:
+            start_worker(nfqueue)
 
-    mangle_obs = observers.observe()
+    mangle_obs = observers.observe(reload_config)
     mangle_obs.start()
 
-    while True:
-        for queue_number in range(retries):
-            try:
-                nfqueue.bind(queue_number, mangle_dns)
-                setup_ip6tables(queue_number)
-                break
-            except ImportError:
-                logger.debug(
-                    "Attaching to netfilter queue %s failed, retrying.",
-                    queue_number,
-                )
-            if queue_number >= retries - 1:
-                logger.critical("Could not find an available netfilter queue.")
-                sys.exit(1)
-        try:
-            logger.info("Starting mangle process.")
-            nfqueue.run()
-        except KeyboardInterrupt:
-            logger.info("Exiting mangle process.")
-            sys.exit(0)
-        except Exception:
-            logger.critical(
-                "Mangle process ended prematurely. Restarting.",
-                exc_info=True,
-            )
-        finally:
-            clean_ip6tables()
+    # Workers that keep failing are restarted with an increasing delay. The delay is
+    # reset once the workers have run for a while.
+    delay = RESTART_DELAY
+    started = monotonic()
+    try:
+        while True:
+            multiprocessing.connection.wait([x.sentinel for x in WORKER_PROCESSES])
+            if monotonic() - started > RESTART_RESET_AFTER:
+                delay = RESTART_DELAY
+            sleep(delay + random.random() * RESTART_DELAY)  # noqa: S311
+            delay = min(delay * 2, RESTART_DELAY_MAX)
+            started = monotonic()
+            with WORKER_PROCESSES_LOCK:
+                for worker in [x for x in WORKER_PROCESSES if not x.is_alive()]:
+                    logger.warning(
+                        "Mangle worker exited with code %s. Restarting.",
+                        worker.exitcode,
+                    )
+                    nfqueue, conn = WORKER_PROCESSES.pop(worker)
+                    conn.close()
+                    start_worker(nfqueue)
+    except KeyboardInterrupt:
+        logger.info("Exiting mangle process.")
+        sys.exit(0)
+    finally:
+        clean_ip6tables()
+        for nfqueue in nfqueues:
             nfqueue.unbind()
 
-        sleep(0.1)
-
 
 if __name__ == "__main__":
     main()
@@ -1,38 +1,61 @@
 """vpncmangle observers to load ACLs."""
 
 import logging
-import time
+import queue
+import threading
+from collections.abc import Callable
+from typing import Any
 
 from watchdog.events import FileSystemEvent, PatternMatchingEventHandler
 from watchdog.observers import Observer
 from watchdog.observers.api import BaseObserver
 
-from . import config, helpers
+from . import config
 
 logger = logging.getLogger("vpncmangle")
 
 
-def observe() -> BaseObserver:
-    """Create the observer for swanctl configuration."""
+def observe(reload_config: Callable[[], None]) -> BaseObserver:
+    """Create the observer for the vpncmangle configuration."""
 
     # Define what should happen when downlink files are created, modified or deleted.
     class VpnmanglerHandler(PatternMatchingEventHandler):
-        """Handler for the event monitoring."""
+        """Handler for the event monitoring.
+
+        Events are not handled directly. They are queued and a single worker reloads
+        the configuration once a burst of events has passed.
+        """
+
+        def __init__(self, *args: Any, **kwargs: Any) -> None:  # noqa: ANN401
+            super().__init__(*args, **kwargs)
+            self.events: queue.Queue[str] = queue.Queue()
+            worker = threading.Thread(target=self.reload_worker, daemon=True)
+            worker.start()
 
         def on_created(self, event: FileSystemEvent) -> None:
             logger.info("File %s: %s", event.event_type, event.src_path)
-            time.sleep(0.1)
-            helpers.load_config()
+            self.events.put(event.src_path)
 
         def on_modified(self, event: FileSystemEvent) -> None:
             logger.info("File %s: %s", event.event_type, event.src_path)
-            time.sleep(0.1)
-            helpers.load_config()
+            self.events.put(event.src_path)
 
         def on_deleted(self, event: FileSystemEvent) -> None:
             logger.info("File %s: %s", event.event_type, event.src_path)
-            time.sleep(0.1)
-            helpers.load_config()
+            self.events.put(event.src_path)
+
+        def reload_worker(self) -> None:
+            """Reload the configuration once per burst of file events."""
+            while True:
+                self.events.get()
+                # Drain the events that arrive in quick succession, such as when the
+                # file is written in several steps.
+                while True:
+                    try:
+                        self.events.get(timeout=0.25)
+                    except queue.Empty:
+                        break
+                reload_config()
 
     # Create the observer object. This doesn't start the handler.
     observer: BaseObserver = Observer()